@@ -0,0 +1,268 @@
+#Benchmark: times the dashboard's hot paths on synthetic datasets and tracks regressions between runs
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from energy_core.figures import line_figure
+from energy_core.forecast_cache import fit_arima_forecast
+from energy_core.gaps import MIN_FORECAST_YEARS
+from energy_core.panel_forecast import country_panel, forecast_panel
+from energy_core.pipeline import FORECAST_STEPS
+from energy_core.query_index import FrameIndex
+from energy_core.rollup_cube import RollupCube
+from energy_core.schema import compact
+
+REGIONS = ["Africa", "Asia Pacific", "CIS", "Europe", "Middle East", "North America", "South & Central America"]
+BASE_COUNTRIES = 100
+YEARS = np.arange(2000, 2024)
+FAST_STAGES = ("filtering", "overview", "economic", "panel_forecast")
+
+
+def synthetic_dataset(scale, seed=0):
+    # BASE_COUNTRIES * scale countries over 2000-2023 with the columns the dashboard uses
+    rng = np.random.default_rng(seed)
+    n_countries = int(BASE_COUNTRIES * scale)
+    countries = np.array([f"Country {i:06d}" for i in range(n_countries)])
+    base = rng.uniform(20, 3000, n_countries)
+    growth = rng.uniform(-0.01, 0.05, n_countries)
+
+    t = np.tile(np.arange(len(YEARS)), n_countries)
+    country_pos = np.repeat(np.arange(n_countries), len(YEARS))
+    energy = base[country_pos] * (1 + growth[country_pos]) ** t * (1 + rng.normal(0, 0.02, len(t)))
+    return pd.DataFrame({
+        "Country": countries[country_pos],
+        "Year": np.tile(YEARS, n_countries),
+        "Region": np.array(REGIONS)[country_pos % len(REGIONS)],
+        "primary_energy_consumption": energy,
+        "gdp": base[country_pos] * 1e9 * (1 + growth[country_pos] + 0.01) ** t,
+        "population": (base[country_pos] * 1e5 * 1.01 ** t).astype("int64"),
+        "oilcons_ej": energy * 0.0036 * 0.4,
+        "coalcons_ej": energy * 0.0036 * 0.25,
+        "gascons_ej": energy * 0.0036 * 0.25,
+        "ren_power_ej": energy * 0.0036 * 0.1,
+    })
+
+
+def selections(df):
+    # Forecast countries are taken from inside each selection's regions, as the dashboard's dropdown offers them
+    def countries_in(regions, n):
+        return list(df.loc[df["Region"].isin(regions), "Country"].unique()[:n])
+
+    return {
+        "all_regions": {"regions": REGIONS, "years": (2000, 2023), "countries": countries_in(REGIONS, 1)},
+        "two_regions": {"regions": REGIONS[:2], "years": (2010, 2020), "countries": countries_in(REGIONS[:2], 2)},
+        "one_region_one_year": {"regions": REGIONS[3:4], "years": (2023, 2023),
+                                "countries": countries_in(REGIONS[3:4], 10)},
+    }
+
+
+# ------------------ Stages ------------------
+def dataset_stages(df, parquet_path, xlsx_path, state):
+    # Once per dataset version: loading and building the index/cube
+
+    def excel_load():
+        return len(pd.read_excel(xlsx_path))
+
+    def cache_load():
+        import pyarrow.parquet as pq
+        return len(pq.read_table(parquet_path, memory_map=True).to_pandas())
+
+    def build_index():
+        state["index"] = FrameIndex(df)
+        return len(df)
+
+    def build_cube():
+        state["cube"] = RollupCube.from_frame(df)
+        return len(df)
+
+    stages = {"cache_load": cache_load, "index_build": build_index, "cube_build": build_cube}
+    if xlsx_path is not None:
+        stages = {"excel_load": excel_load, **stages}
+    return stages
+
+
+def selection_stages(selection, state):
+    # Every rerun: filtering, aggregation, forecasting and figures for one filter selection
+    regions, years, countries = selection["regions"], selection["years"], selection["countries"]
+
+    def filtering():
+        rows = state["index"].rows(regions, years)
+        state["final_data"] = state["index"].take(rows)
+        return len(rows)
+
+    def overview():
+        cube = state["cube"]
+        state["trend"] = cube.trend(regions, years)
+        cube.source_totals(regions, years)
+        return len(cube.top_countries(regions, years))
+
+    def economic():
+        return len(state["cube"].region_totals(regions, years[1]))
+
+    def arima():
+        # ARIMA is fitted for at most two countries, on the selected years, as in the dashboard; a fit that fails is
+        # recorded for its country instead of ending the run
+        data = state["index"].select(regions, years, countries=countries[:2])
+        panel = country_panel(data, countries[:2])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for country in panel.columns:
+                try:
+                    fit_arima_forecast(panel[country].dropna(), (2, 1, 2), FORECAST_STEPS)
+                except Exception as e:
+                    state["fit_errors"][str(country)] = f"{type(e).__name__}: {e}"
+        return panel.size
+
+    def panel():
+        data = state["index"].select(regions, years, countries=countries)
+        return forecast_panel(country_panel(data, countries), FORECAST_STEPS).size
+
+    def figures():
+        fig = line_figure(state["trend"], x="Year", y="primary_energy_consumption", color="Region", markers=True)
+        payload = fig.to_json()
+        state["payload_bytes"] = len(payload)
+        return len(state["trend"])
+
+    stages = {"filtering": filtering, "overview": overview, "economic": economic}
+    # Selections shorter than the dashboard's minimum history offer no countries to forecast, so there is nothing
+    # to time
+    if years[1] - years[0] + 1 >= MIN_FORECAST_YEARS:
+        stages.update(arima_fit=arima, panel_forecast=panel)
+    stages["figures"] = figures
+    return stages
+
+
+def time_stage(function, repeats):
+    # One untimed call first, so lazy imports (statsmodels, plotly) and first-use setup are not counted
+    function()
+    timings, rows = [], 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        rows = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    # One extra run under tracemalloc for the peak allocation
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings = np.array(timings)
+    return {
+        "repeats": repeats,
+        "rows": int(rows),
+        "mean_ms": float(timings.mean()),
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p90_ms": float(np.percentile(timings, 90)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "peak_mb": peak / 1024 ** 2,
+    }
+
+
+def run(scales, repeats, stages=None, excel_max_scale=10):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in scales:
+            raw = synthetic_dataset(scale)
+            df, _ = compact(raw)
+            parquet_path = os.path.join(workdir, f"scale_{scale}.parquet")
+            df.to_parquet(parquet_path, compression="zstd", index=False)
+            xlsx_path = None
+            if scale <= excel_max_scale:
+                xlsx_path = os.path.join(workdir, f"scale_{scale}.xlsx")
+                raw.to_excel(xlsx_path, index=False)
+
+            state = {}
+            plan = [("dataset", dataset_stages(df, parquet_path, xlsx_path, state))]
+            plan += [(name, selection_stages(selection, state)) for name, selection in selections(df).items()]
+            for selection_name, functions in plan:
+                for stage, function in functions.items():
+                    if stages and stage not in stages:
+                        # Later stages need the index, cube and trend data even when these are not timed
+                        if stage in ("index_build", "cube_build", "overview"):
+                            function()
+                        continue
+                    # Loads, builds, model fits and figures are slow; run them fewer times
+                    stage_repeats = repeats if stage in FAST_STAGES else max(1, repeats // 5)
+                    state["fit_errors"] = {}
+                    result = time_stage(function, stage_repeats)
+                    result.update(stage=stage, scale=scale, selection=selection_name, dataset_rows=len(df))
+                    if stage == "figures":
+                        result["payload_bytes"] = state["payload_bytes"]
+                    if state["fit_errors"]:
+                        result["fit_errors"] = state["fit_errors"]
+                    results.append(result)
+                    print(f"scale {scale:>6} {selection_name:<20} {stage:<15} "
+                          f"p50 {result['p50_ms']:9.2f} ms  p90 {result['p90_ms']:9.2f} ms  "
+                          f"peak {result['peak_mb']:8.1f} MB"
+                          + (f"  failed fits: {', '.join(state['fit_errors'])}" if state["fit_errors"] else ""),
+                          flush=True)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    # Stages whose median got slower than the baseline by more than `threshold` (a fraction)
+    with open(baseline_path, "r", encoding="utf-8") as handle:
+        baseline = {(r["stage"], r["scale"], r["selection"]): r for r in json.load(handle)["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline.get((result["stage"], result["scale"], result["selection"]))
+        if previous and result["p50_ms"] > previous["p50_ms"] * (1 + threshold):
+            regressions.append((result, previous))
+    for result, previous in regressions:
+        print(f"REGRESSION {result['stage']} scale {result['scale']} {result['selection']}: "
+              f"p50 {previous['p50_ms']:.2f} ms -> {result['p50_ms']:.2f} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's hot paths on synthetic data.")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100],
+                        help="Dataset sizes as multiples of 100 countries x 24 years (default 1 10 100)")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--stages", nargs="+", help="Only run these stages")
+    parser.add_argument("--excel-max-scale", type=float, default=10,
+                        help="Skip the Excel load above this scale (default 10)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Previous results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed p50 slowdown against --compare, as a fraction (default 0.2)")
+    args = parser.parse_args(argv)
+
+    scales = [int(scale) if float(scale).is_integer() else scale for scale in args.scales]
+    results = run(scales, args.repeats, args.stages, args.excel_max_scale)
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump({
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+            },
+            "results": results,
+        }, handle, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
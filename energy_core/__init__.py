@@ -0,0 +1 @@
+#Energy core: data loading, filtering, aggregation and forecasting used by the dashboard, batch jobs and benchmarks
@@ -0,0 +1,285 @@
+#API: the dashboard's aggregates and forecasts over HTTP as JSON or Arrow IPC; a plain ASGI app, no Streamlit
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs
+
+import pandas as pd
+import pyarrow as pa
+
+from .app_cache import shared_cache
+from .batch_forecast import load_forecast_store
+from .gaps import clean_panel_for
+from .pipeline import (FORECAST_STEPS, MAX_FORECAST_COUNTRIES, apply_growth, complete_forecasts, country_forecasts,
+                       dataset_source, forecast_years, load_backend, too_short_to_forecast)
+
+DATA_PATH = os.environ.get("ENERGY_DATA_PATH", "Processed_Merged_Energy_Data.xlsx")
+# How often the dataset version is rechecked; between checks requests never touch the disk
+VERSION_CHECK_SECONDS = float(os.environ.get("ENERGY_API_VERSION_CHECK_SECONDS", 2))
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+JSON_TYPE = "application/json"
+
+
+class ApiError(Exception):
+    # details: extra fields for the JSON error body, e.g. the error per country
+    def __init__(self, status, message, details=None):
+        super().__init__(message)
+        self.status = status
+        self.details = details or {}
+
+
+class DatasetHandle:
+    # One query backend per dataset version, shared by every request instead of reopening the store
+
+    def __init__(self, path=DATA_PATH):
+        self.path = path
+        self.version = None
+        self.bundle = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.bundle is not None and time.monotonic() - self._checked_at < VERSION_CHECK_SECONDS:
+            return self.version, self.bundle
+        with self._lock:
+            if self.bundle is None or time.monotonic() - self._checked_at >= VERSION_CHECK_SECONDS:
+                try:
+                    from_store, version = dataset_source(self.path)
+                except FileNotFoundError:
+                    raise ApiError(503, f"Dataset not found: {self.path}")
+                if version != self.version:
+                    backend = load_backend(self.path, version, from_store)
+                    first_year, last_year = backend.year_bounds()
+                    self.bundle = {"backend": backend, "first_year": first_year, "last_year": last_year,
+                                   "regions": sorted(map(str, backend.regions()))}
+                    self.version = version
+                self._checked_at = time.monotonic()
+        return self.version, self.bundle
+
+
+datasets = DatasetHandle()
+
+
+# ------------------ Query parameters ------------------
+def _list(params, name):
+    values = []
+    for value in params.get(name, []):
+        values += [item.strip() for item in value.split(",") if item.strip()]
+    return values
+
+
+def _number(params, name, default, kind=int):
+    if name not in params:
+        return default
+    try:
+        return kind(params[name][-1])
+    except ValueError:
+        raise ApiError(400, f"Invalid value for {name}: {params[name][-1]}")
+
+
+def selection(params, data):
+    # Canonical filters, with the dashboard's defaults (all regions, every year in the data)
+    start = _number(params, "start", data["first_year"])
+    end = _number(params, "end", data["last_year"])
+    if start > end:
+        raise ApiError(400, "start must not be after end")
+    n = _number(params, "n", 3)
+    if n < 1:
+        raise ApiError(400, "n must be at least 1")
+    return {
+        "regions": tuple(sorted(_list(params, "regions"))) or tuple(data["regions"]),
+        "years": (start, end),
+        "countries": tuple(_list(params, "countries")),
+        "n": n,
+        "model": params.get("model", ["arima"])[-1].lower(),
+        "gdp_growth": _number(params, "gdp_growth", 0.0, float),
+        "population_growth": _number(params, "population_growth", 0.0, float),
+    }
+
+
+# ------------------ Endpoints ------------------
+def _aggregate(name, version, query, compute):
+    # Same cache entries as the dashboard's sections for the same selection
+    filter_key = (version, query["regions"], query["years"])
+    return shared_cache.get_or_compute("aggregates", (name, filter_key), compute)
+
+
+def trends(version, data, query):
+    return _aggregate("trends", version, query, lambda: data["backend"].trend(query["regions"], query["years"]))
+
+
+def sources(version, data, query):
+    totals = _aggregate("sources", version, query,
+                        lambda: data["backend"].source_totals(query["regions"], query["years"]))
+    return totals.rename_axis("source").reset_index(name="consumption")
+
+
+def top_countries(version, data, query):
+    if query["n"] == 3:
+        return _aggregate("top_countries", version, query,
+                          lambda: data["backend"].top_countries(query["regions"], query["years"], n=3))
+    return data["backend"].top_countries(query["regions"], query["years"], n=query["n"])
+
+
+def region_totals(version, data, query):
+    # Totals for the last year of the range, as in the Economic Impact section
+    return _aggregate("region_totals", version, query,
+                      lambda: data["backend"].region_totals(query["regions"], query["years"][1]))
+
+
+def rows(version, data, query):
+    return data["backend"].select(query["regions"], query["years"], countries=list(query["countries"]) or None)
+
+
+def forecasts(version, data, query):
+    if not query["countries"]:
+        raise ApiError(400, "countries is required")
+    if query["model"] not in MAX_FORECAST_COUNTRIES:
+        raise ApiError(400, f"Unknown model: {query['model']}")
+    limit = MAX_FORECAST_COUNTRIES[query["model"]]
+    if len(query["countries"]) > limit:
+        raise ApiError(400, f"At most {limit} countries can be forecast with model={query['model']}")
+    # Fitted on the cleaned panel, as in the dashboard
+    history = clean_panel_for(data["backend"], version).history(query["countries"], query["regions"], query["years"])
+    countries = list(history.columns)
+    if not countries:
+        raise ApiError(404, "No data for the selected countries")
+    last_year = data["last_year"]
+
+    errors = too_short_to_forecast(history, countries, last_year)
+    fit = [country for country in countries if country not in errors]
+    results = {}
+    if query["model"] == "panel" and fit:
+        try:
+            results = country_forecasts(history, fit, last_year, FORECAST_STEPS, panel_engine=True)
+        except Exception as e:
+            errors.update({country: f"{type(e).__name__}: {e}" for country in fit})
+    elif fit:
+        # One fit per country, so a failing model is reported for that country only
+        forecast_store = load_forecast_store()
+        for country in fit:
+            try:
+                results.update(country_forecasts(history, [country], last_year, FORECAST_STEPS,
+                                                 forecast_store=forecast_store))
+            except Exception as e:
+                errors[country] = f"{type(e).__name__}: {e}"
+    results, incomplete = complete_forecasts(results)
+    errors.update({country: "the model returned no values" for country in incomplete})
+    if errors:
+        raise ApiError(422, f"No forecast for {', '.join(errors)}", {"countries": errors})
+
+    # Each country's forecast starts after its own last year in the selection, which may be before last_year
+    return pd.concat([
+        pd.DataFrame({
+            "Country": country,
+            "Year": forecast_years(history, country, last_year, FORECAST_STEPS),
+            "Forecast": apply_growth(results[country], query["gdp_growth"], query["population_growth"]),
+        })
+        for country in countries
+    ], ignore_index=True)
+
+
+ROUTES = {
+    "/trends": trends,
+    "/sources": sources,
+    "/top-countries": top_countries,
+    "/region-totals": region_totals,
+    "/rows": rows,
+    "/forecasts": forecasts,
+}
+
+
+# ------------------ Responses ------------------
+def encode(frame, fmt):
+    if fmt == "arrow":
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    return frame.to_json(orient="records").encode("utf-8")
+
+
+async def respond(scope):
+    # (status, headers, body) for one request
+    if scope["method"] not in ("GET", "HEAD"):
+        raise ApiError(405, "Only GET is supported")
+    handler = ROUTES.get(scope["path"].rstrip("/") or "/")
+    if handler is None:
+        raise ApiError(404, f"Unknown endpoint; available: {', '.join(ROUTES)}")
+
+    params = parse_qs(scope["query_string"].decode("latin-1"))
+    headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+    fmt = params.get("format", [""])[-1].lower()
+    if fmt not in ("json", "arrow"):
+        fmt = "arrow" if ARROW_TYPE in headers.get("accept", "") else "json"
+
+    version, data = datasets.get()
+    query = selection(params, data)
+    # A response only depends on the dataset version and the canonical query, so the ETag is known before computing
+    key = (scope["path"], tuple(sorted(query.items())), version, fmt)
+    etag = '"' + hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + '"'
+    response_headers = [
+        (b"etag", etag.encode("latin-1")),
+        (b"cache-control", b"no-cache"),
+        (b"x-dataset-version", str(version).encode("latin-1")),
+    ]
+    if etag in (tag.strip() for tag in headers.get("if-none-match", "").split(",")):
+        return 304, response_headers, b""
+
+    body = shared_cache.get("api", key)
+    if body is None:
+        # pandas/numpy work runs off the event loop so slow forecasts do not hold up other requests
+        frame = await asyncio.get_running_loop().run_in_executor(None, handler, version, data, query)
+        body = shared_cache.put("api", key, encode(frame, fmt))
+    content_type = ARROW_TYPE if fmt == "arrow" else JSON_TYPE
+    return 200, response_headers + [(b"content-type", content_type.encode("latin-1"))], body
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    try:
+        status, headers, body = await respond(scope)
+    except ApiError as e:
+        status, headers = e.status, [(b"content-type", JSON_TYPE.encode("latin-1"))]
+        body = json.dumps({"error": str(e), **e.details}).encode("utf-8")
+    except Exception as e:
+        # Still answer the request, with the error, rather than dropping the connection
+        status, headers = 500, [(b"content-type", JSON_TYPE.encode("latin-1"))]
+        body = json.dumps({"error": f"{type(e).__name__}: {e}"}).encode("utf-8")
+    if scope["method"] == "HEAD":
+        body = b""
+    await send({"type": "http.response.start", "status": status,
+                "headers": headers + [(b"content-length", str(len(body)).encode("latin-1"))]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the dashboard's aggregates and forecasts over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("Serving the API needs an ASGI server: pip install uvicorn")
+    uvicorn.run("energy_core.api:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
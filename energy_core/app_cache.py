@@ -0,0 +1,136 @@
+#Shared cache: one memory-budgeted LRU/TTL store for derived data, figures and forecasts in this process
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Budget and expiry (override with ENERGY_CACHE_BUDGET_MB / ENERGY_CACHE_TTL_SECONDS)
+DEFAULT_BUDGET_MB = float(os.environ.get("ENERGY_CACHE_BUDGET_MB", 256))
+DEFAULT_TTL_SECONDS = float(os.environ.get("ENERGY_CACHE_TTL_SECONDS", 6 * 3600))
+
+# [hits, misses] of the script run in the current context; each session's run has its own, so lookups from other
+# sessions are not counted into it
+_run_lookups = contextvars.ContextVar("run_lookups", default=None)
+
+
+def estimate_size(value):
+    # Approximate bytes held by a cached value
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if hasattr(value, "to_json"):  # Plotly figures
+        return len(value.to_json())
+    return sys.getsizeof(value)
+
+
+class BudgetedCache:
+    # Entries are (namespace, key) -> value; the least recently used entries are evicted past the byte budget
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET_MB * 1024 ** 2, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # (namespace, key) -> (value, size, stored_at)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _counter(self, namespace):
+        return self._stats.setdefault(namespace, {"hits": 0, "misses": 0, "evictions": 0, "expired": 0})
+
+    def _drop(self, entry_key):
+        _, size, _ = self._entries.pop(entry_key)
+        self.total_bytes -= size
+
+    def get(self, namespace, key, default=None):
+        entry_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            counter = self._counter(namespace)
+            if entry is not None and self.ttl_seconds and time.monotonic() - entry[2] > self.ttl_seconds:
+                self._drop(entry_key)
+                counter["expired"] += 1
+                entry = None
+            run_lookups = _run_lookups.get()
+            if entry is None:
+                counter["misses"] += 1
+                if run_lookups is not None:
+                    run_lookups[1] += 1
+                return default
+            self._entries.move_to_end(entry_key)
+            counter["hits"] += 1
+            if run_lookups is not None:
+                run_lookups[0] += 1
+            return entry[0]
+
+    def put(self, namespace, key, value):
+        size = estimate_size(value)
+        entry_key = (namespace, key)
+        with self._lock:
+            if entry_key in self._entries:
+                self._drop(entry_key)
+            if size > self.max_bytes:
+                return value  # Larger than the whole budget; hand it back uncached
+            self._entries[entry_key] = (value, size, time.monotonic())
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                evicted = next(iter(self._entries))
+                self._drop(evicted)
+                self._counter(evicted[0])["evictions"] += 1
+        return value
+
+    def get_or_compute(self, namespace, key, compute):
+        missing = object()
+        value = self.get(namespace, key, missing)
+        if value is missing:
+            value = self.put(namespace, key, compute())
+        return value
+
+    def clear(self, namespace=None):
+        with self._lock:
+            for entry_key in [k for k in self._entries if namespace is None or k[0] == namespace]:
+                self._drop(entry_key)
+
+    def stats(self):
+        # One row per namespace for the admin panel
+        with self._lock:
+            sizes, counts = {}, {}
+            for (namespace, _), (_, size, _) in self._entries.items():
+                sizes[namespace] = sizes.get(namespace, 0) + size
+                counts[namespace] = counts.get(namespace, 0) + 1
+            rows = []
+            for namespace in sorted(set(self._stats) | set(sizes)):
+                counter = self._counter(namespace)
+                lookups = counter["hits"] + counter["misses"]
+                rows.append({
+                    "cache": namespace,
+                    "entries": counts.get(namespace, 0),
+                    "size_mb": sizes.get(namespace, 0) / 1024 ** 2,
+                    "hit_rate": counter["hits"] / lookups if lookups else None,
+                    **counter,
+                })
+        return pd.DataFrame(rows)
+
+
+def track_run_lookups():
+    # Starts counting the lookups made from the current context (one script run); returns a function giving the
+    # run's cumulative (hits, misses)
+    lookups = [0, 0]
+    _run_lookups.set(lookups)
+    return lambda: tuple(lookups)
+
+
+# Process-wide instance shared by every Streamlit session
+shared_cache = BudgetedCache()
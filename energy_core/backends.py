@@ -0,0 +1,192 @@
+#Backends: the filtering and aggregation queries behind the dashboard, in memory (pandas) or as SQL over Parquet (DuckDB)
+import os
+
+import numpy as np
+
+from .data_store import CACHE_DIR
+from .gaps import country_year_totals
+from .rollup_cube import ENERGY_SOURCES, MEASURES
+
+# Which backend serves the queries (override with ENERGY_BACKEND=duckdb)
+BACKEND = os.environ.get("ENERGY_BACKEND", "pandas").lower()
+# DuckDB spills to disk beyond this, so datasets larger than RAM stay within a bounded footprint
+DUCKDB_MEMORY_LIMIT = os.environ.get("ENERGY_DUCKDB_MEMORY_LIMIT", "1GB")
+DUCKDB_TEMP_DIR = os.path.join(CACHE_DIR, "duckdb_tmp")
+
+TREND_COLUMNS = ["Year", "Region", "primary_energy_consumption", "gdp", "population"]
+TOP_COLUMNS = ["Region", "Country", "primary_energy_consumption"]
+REGION_TOTAL_COLUMNS = ["Region", "total_gdp", "total_population", "total_energy_consumption", "number_of_countries"]
+
+
+class PandasBackend:
+    # The whole dataset in memory: aggregates are sliced from the rollup cube, rows resolved through the query index
+    name = "pandas"
+
+    def __init__(self, df, cube, index):
+        self.df, self.cube, self.index = df, cube, index
+
+    def __len__(self):
+        return len(self.df)
+
+    def regions(self):
+        return sorted(self.df["Region"].unique())
+
+    def year_bounds(self):
+        return int(self.df["Year"].min()), int(self.df["Year"].max())
+
+    # ------------------ Filtering ------------------
+    def count(self, regions, year_range):
+        return len(self.index.rows(regions, year_range))
+
+    def countries(self, regions, year_range, exclude=()):
+        return self.index.countries_in(self.index.rows(regions, year_range), exclude=exclude)
+
+    def select(self, regions, year_range, countries=None):
+        return self.index.select(regions, year_range, countries=countries)
+
+    def country_year_totals(self):
+        return country_year_totals(self.df)
+
+    # ------------------ Aggregates ------------------
+    def trend(self, regions, year_range):
+        return self.cube.trend(regions, year_range)
+
+    def source_totals(self, regions, year_range):
+        return self.cube.source_totals(regions, year_range)
+
+    def top_countries(self, regions, year_range, n=3):
+        return self.cube.top_countries(regions, year_range, n=n)
+
+    def region_totals(self, regions, year):
+        return self.cube.region_totals(regions, year)
+
+
+def _quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class DuckDBBackend:
+    # Same queries as PandasBackend, run by an embedded DuckDB over the Parquet files: region/year predicates and
+    # aggregations are pushed into the scan, so only the needed columns and row groups are read and nothing is kept
+    # in memory between queries
+    name = "duckdb"
+
+    def __init__(self, paths, union_by_name=False):
+        try:
+            import duckdb
+        except ImportError:
+            raise ImportError("ENERGY_BACKEND=duckdb needs the duckdb package: pip install duckdb")
+
+        os.makedirs(DUCKDB_TEMP_DIR, exist_ok=True)
+        self.paths = list(paths)
+        self.connection = duckdb.connect(config={"memory_limit": DUCKDB_MEMORY_LIMIT,
+                                                 "temp_directory": DUCKDB_TEMP_DIR})
+        files = ", ".join(_quote(path) for path in self.paths)
+        # filename/file_row_number keep the source order for the country dropdown
+        self.connection.execute(
+            f"CREATE VIEW dataset AS SELECT * FROM read_parquet([{files}], filename = true, "
+            f"file_row_number = true, union_by_name = {str(union_by_name).lower()})"
+        )
+        self._rows = self._query("SELECT count(*) AS rows FROM dataset")["rows"].iloc[0]
+        # Position of each country's first row in the files; one entry per country, so it is kept in memory
+        first_seen = self._query(
+            "SELECT Country FROM dataset GROUP BY Country ORDER BY min({'file': filename, 'row': file_row_number})"
+        )
+        self._country_rank = {country: rank for rank, country in enumerate(first_seen["Country"])}
+
+    def _query(self, sql, params=()):
+        # One cursor per query: DuckDB cursors may run concurrently, a shared connection may not
+        cursor = self.connection.cursor()
+        try:
+            return cursor.execute(sql, list(params)).df()
+        finally:
+            cursor.close()
+
+    def _where(self, regions, year_range, countries=None):
+        # Placeholders for the values; DuckDB binds them before planning, so the filters still reach the scan
+        regions = [str(region) for region in regions]
+        if not regions or (countries is not None and not len(countries)):
+            return "FALSE", []
+        clauses = ["Year BETWEEN ? AND ?", f"Region IN ({', '.join('?' * len(regions))})"]
+        params = [int(year_range[0]), int(year_range[1]), *regions]
+        if countries is not None:
+            countries = [str(country) for country in countries]
+            clauses.append(f"Country IN ({', '.join('?' * len(countries))})")
+            params += countries
+        return " AND ".join(clauses), params
+
+    def __len__(self):
+        return int(self._rows)
+
+    def regions(self):
+        return self._query("SELECT DISTINCT Region FROM dataset ORDER BY Region")["Region"].tolist()
+
+    def year_bounds(self):
+        bounds = self._query("SELECT min(Year) AS first, max(Year) AS last FROM dataset").iloc[0]
+        return int(bounds["first"]), int(bounds["last"])
+
+    # ------------------ Filtering ------------------
+    def count(self, regions, year_range):
+        where, params = self._where(regions, year_range)
+        return int(self._query(f"SELECT count(*) AS rows FROM dataset WHERE {where}", params)["rows"].iloc[0])
+
+    def countries(self, regions, year_range, exclude=()):
+        # Countries in the selection, in the order they first appear in the files
+        where, params = self._where(regions, year_range)
+        exclude = [str(country) for country in exclude]
+        if exclude:
+            where += f" AND Country NOT IN ({', '.join('?' * len(exclude))})"
+        frame = self._query(f"SELECT DISTINCT Country FROM dataset WHERE {where}", params + exclude)
+        return np.array(sorted(frame["Country"], key=self._country_rank.get), dtype=object)
+
+    def select(self, regions, year_range, countries=None):
+        # Rows in (Region, Year) then source order, like the query index
+        where, params = self._where(regions, year_range, countries)
+        frame = self._query(
+            f"SELECT * EXCLUDE (filename, file_row_number) FROM dataset WHERE {where} "
+            f"ORDER BY Region, Year, filename, file_row_number", params
+        )
+        return frame.astype({"Region": "category", "Country": "category"})
+
+    def country_year_totals(self):
+        # Input of the cleaned panel: per (Country, Year) sums, NULL (NaN) where nothing was reported
+        sums = ", ".join(f"sum({measure}) AS {measure}" for measure in MEASURES)
+        return self._query(f"SELECT Country, Year, first(Region) AS Region, {sums} FROM dataset "
+                           f"GROUP BY Country, Year ORDER BY Country, Year")
+
+    # ------------------ Aggregates ------------------
+    def trend(self, regions, year_range):
+        where, params = self._where(regions, year_range)
+        frame = self._query(
+            f"SELECT Year, Region, coalesce(sum(primary_energy_consumption), 0) AS primary_energy_consumption, "
+            f"avg(gdp) AS gdp, avg(population) AS population FROM dataset WHERE {where} "
+            f"GROUP BY Year, Region ORDER BY Year, Region", params
+        )
+        return frame[TREND_COLUMNS]
+
+    def source_totals(self, regions, year_range):
+        where, params = self._where(regions, year_range)
+        totals = ", ".join(f"coalesce(sum({source}), 0) AS {source}" for source in ENERGY_SOURCES)
+        frame = self._query(f"SELECT {totals} FROM dataset WHERE {where}", params)
+        return frame.iloc[0].astype("float64")
+
+    def top_countries(self, regions, year_range, n=3):
+        where, params = self._where(regions, year_range)
+        frame = self._query(
+            f"SELECT Region, Country, coalesce(sum(primary_energy_consumption), 0) AS energy FROM dataset "
+            f"WHERE {where} GROUP BY Region, Country "
+            f"QUALIFY row_number() OVER (PARTITION BY Region ORDER BY energy DESC) <= ? "
+            f"ORDER BY energy DESC", params + [int(n)]
+        )
+        return frame.rename(columns={"energy": "primary_energy_consumption"})[TOP_COLUMNS]
+
+    def region_totals(self, regions, year):
+        where, params = self._where(regions, (year, year))
+        frame = self._query(
+            f"SELECT Region, coalesce(sum(gdp), 0) AS total_gdp, coalesce(sum(population), 0) AS total_population, "
+            f"coalesce(sum(primary_energy_consumption), 0) AS total_energy_consumption, "
+            f"count(DISTINCT Country) AS number_of_countries FROM dataset WHERE {where} "
+            f"GROUP BY Region ORDER BY Region", params
+        )
+        return frame[REGION_TOTAL_COLUMNS]
+
@@ -0,0 +1,183 @@
+#Backtesting: rolling-origin evaluation of every forecast model per country and horizon, with warm-started refits
+import argparse
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from .batch_forecast import MODELS, _limit_worker_threads, country_series, polynomial_forecast
+from .data_store import CACHE_DIR, load_dataset, read_if_changed, write_parquet
+
+BACKTEST_DIR = os.path.join(CACHE_DIR, "backtest")
+METRICS_PATH = os.path.join(BACKTEST_DIR, "metrics.parquet")
+SUMMARY_PATH = os.path.join(BACKTEST_DIR, "summary.parquet")
+METRICS_COLUMNS = ["Country", "Model", "Horizon", "MSE", "MAE", "Origins"]
+MIN_TRAIN = 10
+MAX_HORIZON = 5
+
+
+# ------------------ Model steps ------------------
+# Each step fits one training window and returns (forecast, state); the state warm-starts the next, longer window
+def arima_step(order):
+    def step(train, horizon, previous):
+        from statsmodels.tsa.arima.model import ARIMA
+        result = ARIMA(train, order=order).fit(start_params=previous)
+        return result.forecast(horizon), result.params
+    return step
+
+
+def ets_step(train, horizon, previous):
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+    result = ExponentialSmoothing(train, trend="add").fit(start_params=previous, use_brute=previous is None)
+    state = np.array([result.params[name] for name in
+                      ("smoothing_level", "smoothing_trend", "initial_level", "initial_trend")])
+    return result.forecast(horizon), state
+
+
+def polynomial_step(train, horizon, previous):
+    return polynomial_forecast(np.arange(len(train)), train, horizon), None
+
+
+# ------------------ Per-country job ------------------
+def backtest_country(country, values, arima_order, min_train=MIN_TRAIN, max_horizon=MAX_HORIZON):
+    # Runs in a worker process: forecasts from every origin (training length) and their errors per horizon
+    values = np.asarray(values, dtype="float64")
+    steps = {"ARIMA": arima_step(tuple(arima_order)), "ETS": ets_step, "Polynomial": polynomial_step}
+    rows, errors = [], {}
+
+    for model in MODELS:
+        step, state = steps[model], None
+        residuals = [[] for _ in range(max_horizon)]
+        failures = 0
+        for origin in range(min_train, len(values)):
+            horizon = min(max_horizon, len(values) - origin)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                try:
+                    forecast, state = step(values[:origin], horizon, state)
+                except Exception:
+                    try:
+                        # The warm start can land in a bad region; retry this window from scratch
+                        forecast, state = step(values[:origin], horizon, None)
+                    except Exception as e:
+                        failures += 1
+                        errors[model] = f"{type(e).__name__}: {e}"
+                        state = None
+                        continue
+            for h, error in enumerate(np.asarray(forecast) - values[origin:origin + horizon]):
+                residuals[h].append(error)
+        for h, horizon_residuals in enumerate(residuals, start=1):
+            if horizon_residuals:
+                horizon_residuals = np.asarray(horizon_residuals)
+                rows.append((country, model, h, float(np.mean(horizon_residuals ** 2)),
+                             float(np.mean(np.abs(horizon_residuals))), len(horizon_residuals)))
+        if failures and model in errors:
+            errors[model] = f"{failures} origins failed, last: {errors[model]}"
+    return rows, errors
+
+
+# ------------------ Tables ------------------
+def summarize(metrics):
+    # One row per country: MSE/MAE per model pooled over horizons and origins, plus the model with the lowest MSE
+    weighted = metrics.assign(SSE=metrics["MSE"] * metrics["Origins"], SAE=metrics["MAE"] * metrics["Origins"])
+    pooled = weighted.groupby(["Country", "Model"], observed=True)[["SSE", "SAE", "Origins"]].sum()
+    pooled["MSE"] = pooled["SSE"] / pooled["Origins"]
+    pooled["MAE"] = pooled["SAE"] / pooled["Origins"]
+    summary = pooled[["MSE", "MAE"]].unstack("Model")
+    summary.columns = [f"{metric} {model}" for metric, model in summary.columns]
+    mse = pooled["MSE"].unstack("Model")
+    summary["Best_Model"] = mse.idxmin(axis=1)
+    return summary.reset_index()
+
+
+def write_excel(metrics, summary, directory):
+    # The metrics workbooks in the layout of the files shipped with the repository
+    os.makedirs(directory, exist_ok=True)
+    names = {"ARIMA": "ARIMA_Metrics_by_Country.xlsx", "ETS": "ETS_Forecast_Metrics.xlsx",
+             "Polynomial": "Polynomial_Regression_Metrics.xlsx"}
+    for model, name in names.items():
+        columns = {f"MSE {model}": "MSE", f"MAE {model}": "MAE"}
+        if f"MSE {model}" in summary:
+            per_model = summary[["Country", *columns]].rename(columns=columns).dropna()
+            per_model.to_excel(os.path.join(directory, name), index=False)
+    combined = summary.rename(columns={"MSE ARIMA": "MSE_ARIMA", "MAE ARIMA": "MAE_ARIMA",
+                                       "MSE Polynomial": "MSE_Polynomial", "MAE Polynomial": "MAE_Polynomial",
+                                       "MSE ETS": "MSE", "MAE ETS": "MAE"})
+    combined = combined.reindex(columns=["Country", "MSE_ARIMA", "MAE_ARIMA", "MSE_Polynomial", "MAE_Polynomial",
+                                         "MSE", "MAE"])
+    combined.to_excel(os.path.join(directory, "Combined_Metrics.xlsx"), index=False)
+    cleaned = summary.rename(columns={"MSE ETS": "MSE ES", "MAE ETS": "MAE ES"})
+    cleaned = cleaned.reindex(columns=["Country", "MSE ARIMA", "MAE ARIMA", "MSE Polynomial", "MAE Polynomial",
+                                       "MSE ES", "MAE ES", "Best_Model"]).dropna()
+    cleaned.to_excel(os.path.join(directory, "Cleaned_Combined_Metrics.xlsx"), index=False)
+
+
+def load_backtest_summary(path=SUMMARY_PATH):
+    return read_if_changed(path, pd.read_parquet)
+
+
+def backtest_summary(summary, countries):
+    if summary is None:
+        return None
+    return summary[summary["Country"].isin(countries)].reset_index(drop=True)
+
+
+# ------------------ Command line ------------------
+def run_backtest(df, min_train=MIN_TRAIN, max_horizon=MAX_HORIZON, workers=None):
+    from .order_selection import load_orders, stored_order
+
+    orders = load_orders()
+    series_by_country = country_series(df)
+    countries = sorted(series_by_country)
+    print(f"Backtesting {len(countries)} countries x {len(MODELS)} models, horizons 1-{max_horizon}, "
+          f"origins from {min_train} years")
+    rows, failures = [], {}
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_limit_worker_threads) as pool:
+        futures = {
+            pool.submit(backtest_country, country, series_by_country[country].to_numpy(),
+                        stored_order(orders, country), min_train, max_horizon): country
+            for country in countries
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            country = futures[future]
+            try:
+                country_rows, errors = future.result()
+            except Exception as e:
+                country_rows, errors = [], {"worker": f"{type(e).__name__}: {e}"}
+            rows += country_rows
+            if errors:
+                failures[country] = errors
+            print(f"[{done}/{len(countries)}] {country} ({time.perf_counter() - started:.1f}s)", flush=True)
+
+    metrics = pd.DataFrame(rows, columns=METRICS_COLUMNS).sort_values(["Country", "Model", "Horizon"])
+    summary = summarize(metrics) if not metrics.empty else pd.DataFrame(columns=["Country", "Best_Model"])
+    os.makedirs(BACKTEST_DIR, exist_ok=True)
+    for frame, path in ((metrics, METRICS_PATH), (summary, SUMMARY_PATH)):
+        write_parquet(frame, path)
+    print(f"Wrote {len(metrics)} metric rows to {METRICS_PATH} and {len(summary)} countries to {SUMMARY_PATH}")
+    for country, errors in sorted(failures.items()):
+        for model, message in errors.items():
+            print(f"  {country} / {model}: {message}", file=sys.stderr)
+    return metrics, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the forecast models for every country.")
+    parser.add_argument("source", help="Path to the source Excel workbook")
+    parser.add_argument("--min-train", type=int, default=MIN_TRAIN, help="Years in the first training window")
+    parser.add_argument("--horizon", type=int, default=MAX_HORIZON, help="Longest horizon scored (default 5)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--excel-dir", help="Also write the *_Metrics*.xlsx workbooks to this directory")
+    args = parser.parse_args(argv)
+    metrics, summary = run_backtest(load_dataset(args.source), args.min_train, args.horizon, args.workers)
+    if args.excel_dir:
+        write_excel(metrics, summary, args.excel_dir)
+
+
+if __name__ == "__main__":
+    main()
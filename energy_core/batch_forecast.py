@@ -0,0 +1,220 @@
+#Batch forecasts: fits ARIMA, ETS and polynomial models for every country and writes one Parquet store
+import argparse
+import os
+import re
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from .data_store import CACHE_DIR, load_dataset, read_if_changed, write_parquet
+from .forecast_cache import series_fingerprint
+from .gaps import CleanPanel
+
+STORE_DIR = os.path.join(CACHE_DIR, "forecast_store")
+STORE_PATH = os.path.join(STORE_DIR, "forecast_store.parquet")
+PARTS_DIR = os.path.join(STORE_DIR, "parts")
+
+MODELS = ("ARIMA", "ETS", "Polynomial")
+ARIMA_ORDER = (2, 1, 2)
+POLYNOMIAL_DEGREE = 2
+STORE_COLUMNS = ["Country", "Model", "Year", "Forecast", "MSE", "MAE", "Order", "Fingerprint"]
+
+
+# ------------------ Models ------------------
+def arima_forecast(years, values, steps, order=ARIMA_ORDER):
+    from statsmodels.tsa.arima.model import ARIMA
+    return np.asarray(ARIMA(values, order=order).fit().forecast(steps=steps), dtype="float64")
+
+
+def ets_forecast(years, values, steps):
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+    return np.asarray(ExponentialSmoothing(values, trend="add").fit().forecast(steps), dtype="float64")
+
+
+def polynomial_forecast(years, values, steps):
+    offset = years - years[0]
+    coefficients = np.polyfit(offset, values, POLYNOMIAL_DEGREE)
+    future = offset[-1] + np.arange(1, steps + 1)
+    return np.polyval(coefficients, future)
+
+
+MODEL_FUNCTIONS = {
+    "ARIMA": arima_forecast,
+    "ETS": ets_forecast,
+    "Polynomial": polynomial_forecast,
+}
+
+
+def order_label(order):
+    return ",".join(str(int(term)) for term in order)
+
+
+# ------------------ Per-country job ------------------
+def country_series(df):
+    # Yearly primary energy consumption per country from the cleaned panel, as used by the dashboard forecast:
+    # interior gaps interpolated, years before the first or after the last report left out
+    history = CleanPanel.from_frame(df, ["primary_energy_consumption"]).wide()
+    return {country: history[country].dropna() for country in history.columns}
+
+
+def fit_country(country, years, values, horizon, holdout, arima_order=ARIMA_ORDER):
+    # Runs in a worker process; a failing model only drops that model for this country
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+    years = np.asarray(years, dtype="int64")
+    values = np.asarray(values, dtype="float64")
+    future_years = np.arange(years[-1] + 1, years[-1] + 1 + horizon)
+    rows, errors = [], {}
+
+    for model in MODELS:
+        fit, order = MODEL_FUNCTIONS[model], ""
+        if model == "ARIMA":
+            fit, order = partial(arima_forecast, order=arima_order), order_label(arima_order)
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                # Hold-out error on the last `holdout` years, then refit on the full history
+                predicted = fit(years[:-holdout], values[:-holdout], holdout)
+                mse = mean_squared_error(values[-holdout:], predicted)
+                mae = mean_absolute_error(values[-holdout:], predicted)
+                forecast = fit(years, values, horizon)
+        except Exception as e:
+            errors[model] = f"{type(e).__name__}: {e}"
+            continue
+        for year, value in zip(future_years, forecast):
+            rows.append((country, model, int(year), float(value), float(mse), float(mae), order))
+
+    return rows, errors
+
+
+def _limit_worker_threads():
+    # One BLAS thread per worker so the pool scales with cores instead of oversubscribing
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+# ------------------ Store ------------------
+def _part_path(country):
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", str(country)).strip("_")
+    return os.path.join(PARTS_DIR, f"{slug}.parquet")
+
+
+def _part_is_current(country, fingerprint, arima_order):
+    path = _part_path(country)
+    if not os.path.exists(path):
+        return False
+    try:
+        part = pd.read_parquet(path, columns=["Model", "Order", "Fingerprint"])
+    except Exception:
+        return False  # Missing, unreadable or written before orders were stored
+    arima_rows = part["Model"] == "ARIMA"
+    return (not part.empty and (part["Fingerprint"] == fingerprint).all()
+            and (part.loc[arima_rows, "Order"] == order_label(arima_order)).all())
+
+
+def _write_part(country, rows, fingerprint):
+    os.makedirs(PARTS_DIR, exist_ok=True)
+    part = pd.DataFrame(rows, columns=STORE_COLUMNS[:-1])
+    part["Fingerprint"] = fingerprint
+    write_parquet(part, _part_path(country))
+
+
+def consolidate_store(countries):
+    frames = [pd.read_parquet(_part_path(c)) for c in countries if os.path.exists(_part_path(c))]
+    store = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=STORE_COLUMNS)
+    os.makedirs(STORE_DIR, exist_ok=True)
+    write_parquet(store, STORE_PATH, compression="zstd")
+    return store
+
+
+def load_forecast_store(path=STORE_PATH):
+    return read_if_changed(path, pd.read_parquet)
+
+
+def stored_forecast(store, country, series, steps, model="ARIMA", order=None):
+    # Precomputed forecast for exactly this series (and ARIMA order, when given), or None
+    if store is None:
+        return None
+    rows = store[(store["Country"] == country) & (store["Model"] == model)]
+    if len(rows) < steps or rows["Fingerprint"].iloc[0] != series_fingerprint(series):
+        return None
+    if order is not None and ("Order" not in rows or rows["Order"].iloc[0] != order_label(order)):
+        return None
+    return rows.sort_values("Year")["Forecast"].to_numpy()[:steps]
+
+
+def stored_metrics(store, countries):
+    if store is None:
+        return None
+    metrics = store[store["Country"].isin(countries)].drop_duplicates(["Country", "Model"])
+    return metrics[["Country", "Model", "MSE", "MAE"]].reset_index(drop=True)
+
+
+# ------------------ Command line ------------------
+def run_batch(df, horizon=5, holdout=5, workers=None, resume=True):
+    from .order_selection import load_orders, stored_order
+
+    # ARIMA uses each country's order from order_selection.py, or ARIMA_ORDER where none was selected
+    orders = load_orders()
+    series_by_country = country_series(df)
+    countries = sorted(series_by_country)
+    todo = []
+    for country in countries:
+        series = series_by_country[country]
+        fingerprint = series_fingerprint(series)
+        arima_order = stored_order(orders, country)
+        if resume and _part_is_current(country, fingerprint, arima_order):
+            continue
+        todo.append((country, series, fingerprint, arima_order))
+
+    print(f"{len(countries)} countries, {len(countries) - len(todo)} up to date, {len(todo)} to fit")
+    failures = {}
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_limit_worker_threads) as pool:
+        futures = {
+            pool.submit(fit_country, country, series.index.to_numpy(), series.to_numpy(), horizon, holdout,
+                        arima_order): (country, fingerprint)
+            for country, series, fingerprint, arima_order in todo
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            country, fingerprint = futures[future]
+            try:
+                rows, errors = future.result()
+            except Exception as e:
+                rows, errors = [], {"worker": f"{type(e).__name__}: {e}"}
+            if rows:
+                _write_part(country, rows, fingerprint)
+            if errors:
+                failures[country] = errors
+            status = "ok" if not errors else "failed: " + ", ".join(sorted(errors))
+            print(f"[{done}/{len(todo)}] {country} {status} ({time.perf_counter() - started:.1f}s)", flush=True)
+
+    store = consolidate_store(countries)
+    print(f"Wrote {len(store)} rows to {STORE_PATH}")
+    for country, errors in sorted(failures.items()):
+        for model, message in errors.items():
+            print(f"  {country} / {model}: {message}", file=sys.stderr)
+    return store, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit forecasts and error metrics for every country.")
+    parser.add_argument("source", help="Path to the source Excel workbook")
+    parser.add_argument("--horizon", type=int, default=5, help="Years to forecast (default 5)")
+    parser.add_argument("--holdout", type=int, default=5, help="Years held out for MSE/MAE (default 5)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--no-resume", action="store_true", help="Refit countries that are already stored")
+    args = parser.parse_args(argv)
+    run_batch(load_dataset(args.source), args.horizon, args.holdout, args.workers, resume=not args.no_resume)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#Dataset cache: converts the Excel workbook once to Parquet and serves later loads from it
+import argparse
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .schema import SCHEMA_VERSION, compact, describe_report
+
+# Cache location (override with ENERGY_CACHE_DIR); defaults to .energy_cache next to the package
+CACHE_DIR = os.environ.get(
+    "ENERGY_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".energy_cache")
+)
+
+# In-process memo so warm Streamlit reruns only pay for an os.stat call
+_loaded = {}
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_paths(source_path):
+    # One Parquet file + manifest per source workbook, named after the workbook and its absolute path
+    source_path = os.path.abspath(source_path)
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    tag = hashlib.sha1(source_path.encode("utf-8")).hexdigest()[:10]
+    base = os.path.join(CACHE_DIR, f"{stem}-{tag}")
+    return base + ".parquet", base + ".manifest.json"
+
+
+# ------------------ File helpers ------------------
+def write_atomic(path, write):
+    # write(tmp_path), then rename the result over path, so readers never see a partly written file; the temporary
+    # name is per process and thread, as sessions and API workers can write the same file at once
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_parquet(frame, path, **options):
+    write_atomic(path, lambda tmp_path: frame.to_parquet(tmp_path, index=False, **options))
+
+
+def write_json(value, path):
+    def dump(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(value, handle, indent=2)
+    write_atomic(path, dump)
+
+
+def read_json(path):
+    # None when the file is missing or unreadable
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+_file_memo = {}  # path -> (mtime, value)
+
+
+def read_if_changed(path, read, missing=None):
+    # read(path), run again only when the file changes; `missing` when there is no file
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return missing
+    memo = _file_memo.get(path)
+    if memo is None or memo[0] != mtime:
+        memo = _file_memo[path] = (mtime, read(path))
+    return memo[1]
+
+
+def _stat_key(stat):
+    return stat.st_mtime_ns, stat.st_size
+
+
+def dataset_fingerprint(source_path):
+    # Content hash of the source workbook; only re-hashed when mtime/size change
+    parquet_path, manifest_path = cache_paths(source_path)
+    stat = os.stat(source_path)
+    manifest = read_json(manifest_path)
+    if manifest and (manifest["mtime_ns"], manifest["size"]) == _stat_key(stat):
+        return manifest["sha256"]
+    return file_sha256(source_path)
+
+
+def dataset_version(source_path):
+    # Version tag for derived caches; free once the dataset is loaded in this process
+    parquet_path, _ = cache_paths(source_path)
+    memo = _loaded.get(parquet_path)
+    if memo is not None and memo[0] == _stat_key(os.stat(source_path)):
+        return memo[1]
+    return dataset_fingerprint(source_path)
+
+
+def build_cache(source_path):
+    # Parse the workbook once, validate it and write a compressed Parquet copy in compact dtypes
+    parquet_path, manifest_path = cache_paths(source_path)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    stat = os.stat(source_path)
+    sha256 = file_sha256(source_path)
+    df, memory_report = compact(pd.read_excel(source_path))
+
+    write_parquet(df, parquet_path, engine="pyarrow", compression="zstd")
+
+    write_json({
+        "source": os.path.abspath(source_path),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": sha256,
+        "rows": len(df),
+        **memory_report,
+    }, manifest_path)
+    _loaded[parquet_path] = (_stat_key(stat), sha256, df)
+    return df
+
+
+def invalidate_cache(source_path):
+    parquet_path, manifest_path = cache_paths(source_path)
+    _loaded.pop(parquet_path, None)
+    removed = False
+    for path in (parquet_path, manifest_path):
+        if os.path.exists(path):
+            os.remove(path)
+            removed = True
+    return removed
+
+
+def load_dataset(source_path):
+    parquet_path, manifest_path = cache_paths(source_path)
+    stat = os.stat(source_path)
+
+    # Warm rerun: same file as last time, reuse the frame already in memory
+    memo = _loaded.get(parquet_path)
+    if memo is not None and memo[0] == _stat_key(stat):
+        return memo[2]
+
+    manifest = read_json(manifest_path)
+    if (manifest is None or not os.path.exists(parquet_path)
+            or manifest.get("schema_version") != SCHEMA_VERSION):
+        return build_cache(source_path)
+
+    if (manifest["mtime_ns"], manifest["size"]) != _stat_key(stat):
+        # File was touched; only rebuild if the content actually changed
+        sha256 = file_sha256(source_path)
+        if sha256 != manifest["sha256"]:
+            return build_cache(source_path)
+        manifest.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        write_json(manifest, manifest_path)
+
+    df = pq.read_table(parquet_path, memory_map=True).to_pandas()
+    _loaded[parquet_path] = (_stat_key(stat), manifest["sha256"], df)
+    return df
+
+
+def cached_parquet(source_path):
+    # Path of an up-to-date Parquet copy of the workbook, for readers that query the file instead of loading it
+    parquet_path, manifest_path = cache_paths(source_path)
+    manifest = read_json(manifest_path)
+    if (manifest is None or not os.path.exists(parquet_path) or manifest.get("schema_version") != SCHEMA_VERSION
+            or manifest["sha256"] != dataset_fingerprint(source_path)):
+        build_cache(source_path)
+    return parquet_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the Parquet cache of the energy dataset.")
+    parser.add_argument("command", choices=["rebuild", "invalidate", "status"])
+    parser.add_argument("source", help="Path to the source Excel workbook")
+    args = parser.parse_args(argv)
+
+    parquet_path, manifest_path = cache_paths(args.source)
+    if args.command == "rebuild":
+        invalidate_cache(args.source)
+        df = build_cache(args.source)
+        print(f"Rebuilt {parquet_path} ({len(df)} rows, memory {describe_report(read_json(manifest_path))})")
+    elif args.command == "invalidate":
+        if invalidate_cache(args.source):
+            print(f"Removed cache for {args.source}")
+        else:
+            print(f"No cache found for {args.source}")
+    else:
+        manifest = read_json(manifest_path)
+        if manifest is None or not os.path.exists(parquet_path):
+            print("No cache")
+        else:
+            fresh = dataset_fingerprint(args.source) == manifest["sha256"]
+            print(f"{parquet_path}: {manifest['rows']} rows, sha256={manifest['sha256'][:12]}, "
+                  f"{'fresh' if fresh else 'stale'}")
+            if "memory_before" in manifest:
+                print(f"Memory: {describe_report(manifest)}")
+
+
+if __name__ == "__main__":
+    main()
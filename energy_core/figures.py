@@ -0,0 +1,191 @@
+#Figures: line charts with bounded payloads, downsampled per trace and drawn with WebGL for large series
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+# Points kept per trace, about one per horizontal pixel of a wide chart (override with ENERGY_FIGURE_MAX_POINTS)
+MAX_POINTS = int(os.environ.get("ENERGY_FIGURE_MAX_POINTS", 1000))
+# Total points above which traces switch from SVG to WebGL (scattergl)
+WEBGL_THRESHOLD = int(os.environ.get("ENERGY_FIGURE_WEBGL_THRESHOLD", 5000))
+# Markers are dropped from traces longer than this; they would only blur into the line
+MARKERS_MAX_POINTS = 200
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: positions of `threshold` points that keep the visual shape of (x, y)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+
+    # threshold - 2 buckets over the points between the fixed first and last ones
+    bounds = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype("int64") + 1
+    bounds[-1] = n - 1
+    selected = np.empty(threshold, dtype="int64")
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+    for bucket in range(threshold - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        if bucket + 2 < len(bounds):
+            following = slice(end, bounds[bucket + 2])
+            next_x, next_y = x[following].mean(), y[following].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Keep the point forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs((x[anchor] - next_x) * (y[start:end] - y[anchor])
+                      - (x[anchor] - x[start:end]) * (next_y - y[anchor]))
+        anchor = start + int(np.argmax(area))
+        selected[bucket + 1] = anchor
+    return selected
+
+
+def downsample_frame(frame, x, y, color=None, max_points=MAX_POINTS):
+    # At most max_points rows per trace: per `color` group for long data, per y column for wide data
+    columns = [y] if isinstance(y, str) else list(y)
+    if color is not None:
+        parts = []
+        for _, group in frame.groupby(color, observed=True, sort=False):
+            group = group.dropna(subset=columns).sort_values(x)
+            parts.append(group.iloc[lttb(group[x], group[columns[0]], max_points)])
+        return pd.concat(parts) if parts else frame
+    if len(frame) <= max_points:
+        return frame
+    frame = frame.sort_values(x)
+    keep = np.zeros(len(frame), dtype=bool)
+    for column in columns:
+        present = np.flatnonzero(frame[column].notna().to_numpy())
+        keep[present[lttb(frame[x].to_numpy()[present], frame[column].to_numpy()[present], max_points)]] = True
+    return frame[keep]
+
+
+def line_figure(frame, x, y, color=None, markers=False, max_points=MAX_POINTS, **kwargs):
+    # px.line on downsampled data; WebGL traces once the chart holds more than WEBGL_THRESHOLD points
+    data = downsample_frame(frame, x, y, color, max_points)
+    traces = data[color].nunique() if color is not None else (1 if isinstance(y, str) else len(y))
+    points = len(data) if color is not None or isinstance(y, str) else len(data) * traces
+    return px.line(
+        data, x=x, y=y, color=color,
+        markers=markers and points <= MARKERS_MAX_POINTS * max(traces, 1),
+        render_mode="webgl" if points > WEBGL_THRESHOLD else "svg",
+        **kwargs
+    )
+
+
+def fan_figure(history, future_years, bands, countries, percentiles, title=None):
+    # History lines plus shaded percentile bands (outermost pair lightest) and a dashed median per country;
+    # future_years maps each country to its forecast years
+    import plotly.graph_objects as go
+    from plotly.colors import hex_to_rgb
+
+    palette = px.colors.qualitative.Plotly
+    pairs = [(i, len(percentiles) - 1 - i) for i in range(len(percentiles) // 2)]
+    fig = go.Figure()
+    for position, country in enumerate(countries):
+        red, green, blue = hex_to_rgb(palette[position % len(palette)])
+        color = f"rgb({red}, {green}, {blue})"
+        fig.add_trace(go.Scatter(x=history.index, y=history[country], name=country, legendgroup=country,
+                                 mode="lines", line={"color": color}))
+        years = future_years[country]
+        for depth, (low, high) in enumerate(pairs, start=1):
+            fill = f"rgba({red}, {green}, {blue}, {0.15 * depth:.2f})"
+            fig.add_trace(go.Scatter(x=years, y=bands[position, low], legendgroup=country, showlegend=False,
+                                     mode="lines", line={"width": 0}, hoverinfo="skip"))
+            fig.add_trace(go.Scatter(x=years, y=bands[position, high], legendgroup=country,
+                                     name=f"{country} {percentiles[low]}-{percentiles[high]}%", showlegend=False,
+                                     mode="lines", line={"width": 0}, fill="tonexty", fillcolor=fill))
+        if len(percentiles) % 2:
+            middle = len(percentiles) // 2
+            fig.add_trace(go.Scatter(x=years, y=bands[position, middle], legendgroup=country,
+                                     name=f"{country} median", showlegend=False, mode="lines",
+                                     line={"color": color, "dash": "dash"}))
+    fig.update_layout(title=title, xaxis_title="Year", yaxis_title="Energy Consumption (TWh)")
+    return fig
+
+
+# ------------------ Dashboard charts ------------------
+# Built here rather than in energy_dashboard.py so the snapshot export renders exactly the same figures
+CHART_LAYOUT = {"height": 400, "margin": {"t": 40, "b": 80, "l": 50, "r": 50}}
+
+
+def trend_figure(trend_data):
+    # Energy consumption per year, one line per region
+    fig = line_figure(
+        trend_data,
+        x="Year",
+        y="primary_energy_consumption",
+        color="Region",
+        title="Global Energy Consumption Trends by Region",
+        labels={"primary_energy_consumption": "Energy Consumption (TWh)", "Year": "Year"},
+        markers=True
+    )
+    fig.update_layout(**CHART_LAYOUT)
+    return fig
+
+
+def sources_figure(source_totals):
+    # Share of each energy source in the selection
+    fig = px.pie(
+        names=source_totals.index,
+        values=source_totals.values,
+        title="Proportion of Energy Sources by Region",
+        hole=0.4
+    )
+    fig.update_layout(**CHART_LAYOUT)
+    return fig
+
+
+def top_countries_figure(top_countries):
+    fig = px.bar(
+        top_countries,
+        x="primary_energy_consumption",
+        y="Country",
+        color="Region",
+        orientation="h",
+        title="Top 3 Energy Consuming Countries by Region",
+        labels={"primary_energy_consumption": "Energy Consumption (TWh)", "Country": "Country"}
+    )
+    # Linear ticks so no country label is skipped
+    fig.update_layout(**CHART_LAYOUT, yaxis={"tickmode": "linear", "tickangle": 0})
+    return fig
+
+
+def bubble_figure(region_totals, x, label, year):
+    # Energy against one regional total (GDP or population), one bubble per region sized by its number of countries
+    return px.scatter(
+        region_totals,
+        x=x,
+        y="total_energy_consumption",
+        color="Region",
+        size="number_of_countries",
+        title=f"Energy Consumption vs. {label} by Region (Year {year})",
+        size_max=50
+    )
+
+
+def forecast_figure(history, forecasts, future_years, last_year, title):
+    # History per country followed by its forecast (orange), split by a dotted line where the latest forecast
+    # starts; future_years maps each country to its forecast years
+    forecast_columns = [
+        pd.Series(values, index=pd.Index(future_years[country], name="Year"),
+                  name=f"Predicted Energy Consumption (TWh) - {country}")
+        for country, values in forecasts.items()
+    ]
+    combined = pd.concat([history.loc[history.index <= last_year], *forecast_columns], axis=1).reset_index()
+    fig = line_figure(
+        combined,
+        x="Year",
+        y=combined.columns[1:],
+        title=title,
+        labels={"Year": "Year", "Energy Consumption (TWh)": "Energy Consumption (TWh)"},
+        markers=True
+    )
+    for trace in fig.data:
+        if "Predicted" in trace.name:
+            trace.line.color = "orange"
+    forecast_start = max((future_years[country][0] - 1 for country in forecasts), default=last_year)
+    fig.add_vline(x=forecast_start, line_dash="dot", line_color="red", annotation_text="Forecast Start",
+                  annotation_position="top")
+    return fig
@@ -0,0 +1,88 @@
+#Forecast cache: ARIMA forecast vectors kept in the shared in-process cache and persisted on disk
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .app_cache import shared_cache
+from .data_store import CACHE_DIR, write_atomic
+
+FORECAST_DIR = os.path.join(CACHE_DIR, "forecasts")
+
+
+def series_fingerprint(series):
+    # Hash of the years and values the model is fitted on
+    digest = hashlib.sha1()
+    digest.update(np.asarray(series.index, dtype="int64").tobytes())
+    digest.update(np.asarray(series.values, dtype="float64").tobytes())
+    return digest.hexdigest()
+
+
+def forecast_key(country, cutoff, order, steps, fingerprint):
+    payload = json.dumps([str(country), int(cutoff), list(order), int(steps), fingerprint])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def fit_arima_forecast(series, order, steps):
+    from statsmodels.tsa.arima.model import ARIMA
+    model = ARIMA(series, order=order)
+    model_fit = model.fit()
+    return np.asarray(model_fit.forecast(steps=steps), dtype="float64")
+
+
+class ForecastCache:
+    # Unscaled forecast vectors; GDP/population scenarios are applied by the caller
+
+    namespace = "forecasts"
+
+    def __init__(self, memory=shared_cache, directory=FORECAST_DIR):
+        self.memory = memory
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, key):
+        values = self.memory.get(self.namespace, key)
+        if values is not None:
+            return values
+        try:
+            values = np.load(self._path(key))
+        except (OSError, ValueError):
+            return None
+        values.setflags(write=False)
+        return self.memory.put(self.namespace, key, values)
+
+    def put(self, key, values):
+        values = np.asarray(values, dtype="float64")
+        values.setflags(write=False)
+        os.makedirs(self.directory, exist_ok=True)
+
+        def save(tmp_path):
+            # Through a handle, as np.save would add .npy to the temporary name
+            with open(tmp_path, "wb") as handle:
+                np.save(handle, values)
+        write_atomic(self._path(key), save)
+        self.memory.put(self.namespace, key, values)
+
+    def clear(self, disk=False):
+        self.memory.clear(self.namespace)
+        if disk and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".npy"):
+                    os.remove(os.path.join(self.directory, name))
+
+
+# Module-level instance so cached forecasts survive Streamlit reruns
+default_cache = ForecastCache()
+
+
+def cached_forecast(country, series, cutoff, order, steps, cache=None):
+    cache = cache or default_cache
+    key = forecast_key(country, cutoff, order, steps, series_fingerprint(series))
+    values = cache.get(key)
+    if values is None:
+        values = fit_arima_forecast(series, order, steps)
+        cache.put(key, values)
+    return values
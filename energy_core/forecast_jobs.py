@@ -0,0 +1,70 @@
+#Forecast jobs: ARIMA fits run on a background thread pool; identical in-flight requests share one job
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .forecast_cache import default_cache, fit_arima_forecast, forecast_key, series_fingerprint
+
+# Concurrent fits per process (override with ENERGY_FORECAST_WORKERS)
+DEFAULT_WORKERS = int(os.environ.get("ENERGY_FORECAST_WORKERS", 2))
+# A failed job is reported for this long, then the next request for it fits again (ENERGY_FORECAST_RETRY_SECONDS)
+RETRY_SECONDS = float(os.environ.get("ENERGY_FORECAST_RETRY_SECONDS", 60))
+
+
+class ForecastJobs:
+    # Job IDs are forecast cache keys, so a job for the same country, cutoff, order, steps and data is only run once
+
+    def __init__(self, cache=default_cache, max_workers=DEFAULT_WORKERS, retry_seconds=RETRY_SECONDS):
+        self.cache = cache
+        self.retry_seconds = retry_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="forecast")
+        self._running = {}  # job_id -> Future
+        self._failed = {}  # job_id -> (error message, failed at)
+        self._lock = threading.Lock()
+
+    def submit(self, country, series, cutoff, order, steps):
+        # Returns the job ID; a finished job's result is already in the forecast cache
+        job_id = forecast_key(country, cutoff, order, steps, series_fingerprint(series))
+        with self._lock:
+            self._prune_failed()
+            if job_id in self._running or job_id in self._failed or self.cache.get(job_id) is not None:
+                return job_id
+            future = self._executor.submit(self._run, job_id, series.copy(), order, steps)
+            self._running[job_id] = future
+        return job_id
+
+    def _prune_failed(self):
+        # Failures may be transient (a full disk, an interrupted fit), so expired ones are forgotten and the next
+        # request fits again; called with the lock held
+        expired_before = time.monotonic() - self.retry_seconds
+        for job_id in [job_id for job_id, (_, failed_at) in self._failed.items() if failed_at <= expired_before]:
+            del self._failed[job_id]
+
+    def _run(self, job_id, series, order, steps):
+        try:
+            values = fit_arima_forecast(series, order, steps)
+            self.cache.put(job_id, values)
+        except Exception as e:
+            with self._lock:
+                self._failed[job_id] = (str(e), time.monotonic())
+            raise
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+        return values
+
+    def result(self, job_id):
+        # Forecast vector of a finished job, or None while it is still running
+        return self.cache.get(job_id)
+
+    def error(self, job_id):
+        # Error message of a failed job, until its failure expires
+        with self._lock:
+            self._prune_failed()
+            failure = self._failed.get(job_id)
+        return failure[0] if failure else None
+
+
+# Process-wide instance shared by every Streamlit session
+forecast_jobs = ForecastJobs()
@@ -0,0 +1,196 @@
+#Gaps: finds missing years per country and column, interpolates interior gaps and stores the cleaned panel per version
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from .data_store import CACHE_DIR, write_parquet
+from .rollup_cube import MEASURES
+
+PANEL_DIR = os.path.join(CACHE_DIR, "clean_panel")
+# Countries need this many reported years of energy consumption to be offered for forecasting
+MIN_FORECAST_YEARS = 5
+
+
+def country_year_totals(df, columns=MEASURES):
+    # One row per (Country, Year) with its region and column sums; NaN where nothing was reported
+    columns = [column for column in columns if column in df.columns]
+    grouped = df.groupby(["Country", "Year"], observed=True)
+    totals = grouped[columns].sum(min_count=1)
+    totals.insert(0, "Region", grouped["Region"].first())
+    return totals.reset_index()
+
+
+def interpolate_gaps(values):
+    # values: (series, consecutive years), NaN where missing -> (filled, interior-gap mask); every series at once.
+    # Interior gaps are linear between the nearest reported years; gaps before the first or after the last
+    # reported year are left NaN rather than extrapolated
+    observed = np.isfinite(values)
+    n = values.shape[1]
+    positions = np.broadcast_to(np.arange(n), values.shape)
+    previous = np.maximum.accumulate(np.where(observed, positions, -1), axis=1)
+    following = np.minimum.accumulate(np.where(observed, positions, n)[:, ::-1], axis=1)[:, ::-1]
+    interior = ~observed & (previous >= 0) & (following < n)
+
+    rows = np.arange(values.shape[0])[:, None]
+    low = values[rows, previous.clip(min=0)]
+    high = values[rows, following.clip(max=n - 1)]
+    with np.errstate(invalid="ignore"):
+        weight = (positions - previous) / np.maximum(following - previous, 1)
+        filled = np.where(interior, low + weight * (high - low), values)
+    return filled, interior
+
+
+def gap_kinds(values):
+    # "leading", "interior" or "trailing" for each missing cell of (series, years), "" where reported
+    observed = np.isfinite(values)
+    started = np.logical_or.accumulate(observed, axis=1)
+    continues = np.logical_or.accumulate(observed[:, ::-1], axis=1)[:, ::-1]
+    kinds = np.full(values.shape, "", dtype=object)
+    kinds[~observed & ~started] = "leading"
+    kinds[~observed & started & continues] = "interior"
+    kinds[~observed & started & ~continues] = "trailing"
+    return kinds
+
+
+class CleanPanel:
+    # Full (Country, Year) grid with interior gaps interpolated, a <column>_imputed flag per column and a gap report
+
+    def __init__(self, frame, gaps):
+        self.frame, self.gaps = frame, gaps
+        self.country_regions = frame.drop_duplicates("Country").set_index("Country")["Region"]
+        self._wide = {}
+
+    @classmethod
+    def from_totals(cls, totals, columns=MEASURES):
+        columns = [column for column in columns if column in totals.columns]
+        countries = np.sort(totals["Country"].astype(str).unique())
+        years = np.arange(int(totals["Year"].min()), int(totals["Year"].max()) + 1)
+        keys = pd.MultiIndex.from_arrays([totals["Country"].astype(str), totals["Year"].astype("int64")])
+        grid = pd.MultiIndex.from_product([countries, years], names=["Country", "Year"])
+        reported = totals.set_axis(keys)[columns].reindex(grid)
+
+        regions = totals.assign(Country=totals["Country"].astype(str)).groupby("Country")["Region"].first()
+        frame = grid.to_frame(index=False)
+        frame.insert(1, "Region", regions.reindex(countries).astype(str).to_numpy().repeat(len(years)))
+        gaps = []
+        for column in columns:
+            values = reported[column].to_numpy(dtype="float64").reshape(len(countries), len(years))
+            filled, interior = interpolate_gaps(values)
+            frame[column] = filled.ravel()
+            frame[f"{column}_imputed"] = interior.ravel()
+            kinds = gap_kinds(values)
+            missing = np.nonzero(kinds)
+            gaps.append(pd.DataFrame({"Country": countries[missing[0]], "Column": column,
+                                      "Year": years[missing[1]], "Kind": kinds[missing]}))
+        return cls(frame, pd.concat(gaps, ignore_index=True))
+
+    @classmethod
+    def from_frame(cls, df, columns=MEASURES):
+        return cls.from_totals(country_year_totals(df, columns), columns)
+
+    # ------------------ Storage ------------------
+    def save(self, path):
+        # The panel and its gap report, side by side
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for frame, target in ((self.gaps, _gaps_path(path)), (self.frame, path)):
+            write_parquet(frame, target, compression="zstd")
+
+    @classmethod
+    def load(cls, path):
+        return cls(pd.read_parquet(path), pd.read_parquet(_gaps_path(path)))
+
+    # ------------------ Queries ------------------
+    def wide(self, column="primary_energy_consumption"):
+        # Years x countries matrix of one cleaned column
+        table = self._wide.get(column)
+        if table is None:
+            table = self._wide[column] = self.frame.pivot(index="Year", columns="Country", values=column)
+        return table
+
+    def history(self, countries, regions, year_range, column="primary_energy_consumption"):
+        # Years x countries for the selected countries in the selected regions and years, without countries that
+        # reported nothing there; NaN only before a country's first or after its last reported year
+        table = self.wide(column)
+        regions = set(map(str, regions))
+        keep = [str(country) for country in countries
+                if str(country) in table.columns and self.country_regions.get(str(country)) in regions]
+        history = table.loc[year_range[0]:year_range[1], keep]
+        return history.dropna(axis=1, how="all")
+
+    def imputed_years(self, countries, year_range, column="primary_energy_consumption"):
+        # {country: [years filled by interpolation]} for countries with at least one
+        flags = self.wide(f"{column}_imputed").loc[year_range[0]:year_range[1]]
+        return {country: flags.index[flags[country]].tolist() for country in countries
+                if country in flags.columns and flags[country].any()}
+
+    def forecastable(self, min_years=MIN_FORECAST_YEARS, column="primary_energy_consumption"):
+        # Countries with enough reported years to fit a forecast on; interpolated years do not count
+        counts = (self.wide(column).notna() & ~self.wide(f"{column}_imputed").astype(bool)).sum()
+        return set(counts.index[counts >= min_years])
+
+
+def _gaps_path(path):
+    return os.path.splitext(path)[0] + ".gaps.parquet"
+
+
+_panels = {}
+
+
+def panel_path(version):
+    return os.path.join(PANEL_DIR, f"{version}.parquet")
+
+
+def clean_panel_for(backend, version):
+    # One cleaned panel per dataset version: in memory for reruns, on disk for new processes
+    panel = _panels.get(version)
+    if panel is None:
+        path = panel_path(version)
+        try:
+            panel = CleanPanel.load(path)
+        except (OSError, ValueError):
+            panel = CleanPanel.from_totals(backend.country_year_totals())
+            panel.save(path)
+            # Only the current version is kept on disk
+            for name in os.listdir(PANEL_DIR):
+                if not name.startswith(str(version)):
+                    os.remove(os.path.join(PANEL_DIR, name))
+        _panels.clear()
+        _panels[version] = panel
+    return panel
+
+
+def missing_years_report(gaps, column="primary_energy_consumption"):
+    # Countries with missing years of one column, in the layout of missing_data_countries_2000_2023.xlsx
+    missing = gaps[gaps["Column"] == column].groupby("Country", sort=True)["Year"]
+    return pd.DataFrame({"Country": list(missing.groups),
+                         "Missing Years": [str(sorted(map(int, years))) for _, years in missing]})
+
+
+def main(argv=None):
+    from .pipeline import dataset_source, load_backend
+
+    parser = argparse.ArgumentParser(description="Find and fill gaps in the dataset and store the cleaned panel.")
+    parser.add_argument("source", help="Path to the source Excel workbook")
+    parser.add_argument("--excel", help="Also write the missing-years report to this workbook")
+    args = parser.parse_args(argv)
+
+    from_store, version = dataset_source(args.source)
+    panel = clean_panel_for(load_backend(args.source, version, from_store), version)
+    gaps = panel.gaps
+    print(f"Cleaned panel for version {str(version)[:12]}: {panel.frame['Country'].nunique()} countries, "
+          f"{len(gaps)} missing cells, {int((gaps['Kind'] == 'interior').sum())} interpolated")
+    if not gaps.empty:
+        summary = gaps.groupby(["Kind", "Column"]).size().unstack("Kind", fill_value=0)
+        print(summary.to_string())
+    report = missing_years_report(gaps)
+    for country, years in zip(report["Country"], report["Missing Years"]):
+        print(f"  {country}: {years}")
+    if args.excel:
+        report.to_excel(args.excel, index=False)
+        print(f"Wrote {args.excel}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#Incremental ingestion: a year-partitioned dataset store that new years or countries are appended to
+import argparse
+import hashlib
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .data_store import CACHE_DIR, file_sha256, read_json, write_json, write_parquet
+from .rollup_cube import rollup_frame
+from .schema import compact, describe_report
+
+STORE_DIR = os.path.join(CACHE_DIR, "dataset")
+MANIFEST_PATH = os.path.join(STORE_DIR, "manifest.json")
+
+
+def read_source(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".xlsx", ".xls"):
+        return pd.read_excel(path)
+    if extension == ".csv":
+        return pd.read_csv(path)
+    if extension == ".parquet":
+        return pd.read_parquet(path)
+    raise ValueError(f"Unsupported file type: {extension}")
+
+
+def read_manifest():
+    return read_json(MANIFEST_PATH)
+
+
+def _partition_dir(year):
+    return os.path.join(STORE_DIR, f"year_{int(year)}")
+
+
+def has_dataset_store():
+    return os.path.exists(MANIFEST_PATH)
+
+
+def dataset_store_version():
+    manifest = read_manifest()
+    return manifest["version"] if manifest else None
+
+
+# ------------------ Writing ------------------
+def append(source_path):
+    # Writes only the year partitions present in the new file; rows for a (Country, Year) already stored are replaced
+    delta, report = compact(read_source(source_path))
+    manifest = read_manifest() or {"version": "", "partitions": {}, "history": []}
+    os.makedirs(STORE_DIR, exist_ok=True)
+
+    for year, rows in delta.groupby("Year", observed=True):
+        directory = _partition_dir(year)
+        data_path = os.path.join(directory, "data.parquet")
+        if os.path.exists(data_path):
+            existing = pd.read_parquet(data_path)
+            existing = existing[~existing["Country"].isin(rows["Country"].unique())]
+            rows = pd.concat([existing, rows], ignore_index=True)
+        partition, _ = compact(rows)
+
+        os.makedirs(directory, exist_ok=True)
+        write_parquet(partition, data_path, compression="zstd")
+        write_parquet(rollup_frame(partition), os.path.join(directory, "rollup.parquet"), compression="zstd")
+        manifest["partitions"][str(int(year))] = {"rows": len(partition)}
+
+    # New version = hash of the previous version and the appended file
+    delta_hash = file_sha256(source_path)
+    manifest["version"] = hashlib.sha256((manifest["version"] + delta_hash).encode("utf-8")).hexdigest()
+    years = sorted(int(year) for year in manifest["partitions"])
+    manifest["year_min"], manifest["year_max"] = years[0], years[-1]
+    manifest["history"].append({
+        "source": os.path.abspath(source_path),
+        "sha256": delta_hash,
+        "rows": len(delta),
+        "years": sorted(int(year) for year in delta["Year"].unique()),
+    })
+    write_json(manifest, MANIFEST_PATH)
+    return {
+        "rows": len(delta),
+        "years": manifest["history"][-1]["years"],
+        "countries": sorted(map(str, delta["Country"].unique())),
+        "memory": describe_report(report),
+    }
+
+
+def init_store(source_path):
+    shutil.rmtree(STORE_DIR, ignore_errors=True)
+    return append(source_path)
+
+
+# ------------------ Reading ------------------
+def _partition_files(name):
+    manifest = read_manifest()
+    return [os.path.join(_partition_dir(year), name) for year in sorted(manifest["partitions"], key=int)]
+
+
+def _read_partitions(name):
+    tables = [pq.read_table(path, memory_map=True) for path in _partition_files(name)]
+    table = pa.concat_tables(tables, promote_options="permissive").unify_dictionaries()
+    return table.to_pandas()
+
+
+def load_dataset_store():
+    # Partitions may have been compacted to different dtypes; compact the combined frame once more
+    df, _ = compact(_read_partitions("data.parquet"))
+    return df
+
+
+def load_store_rollups():
+    return _read_partitions("rollup.parquet")
+
+
+def dataset_store_files():
+    # Partition files, oldest year first, for readers that query them in place
+    return _partition_files("data.parquet")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the year-partitioned dataset store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    init_parser = commands.add_parser("init", help="Create the store from a full dataset")
+    init_parser.add_argument("source")
+    append_parser = commands.add_parser("append", help="Add or replace years/countries from a file")
+    append_parser.add_argument("source")
+    for command in (init_parser, append_parser):
+        command.add_argument("--forecast", action="store_true",
+                             help="Refit batch forecasts afterwards (only changed countries are refit)")
+    commands.add_parser("status", help="Show the partitions in the store")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        manifest = read_manifest()
+        if manifest is None:
+            print("No dataset store")
+            return
+        print(f"{STORE_DIR}: version {manifest['version'][:12]}, years {manifest['year_min']}-{manifest['year_max']}")
+        for year, partition in sorted(manifest["partitions"].items()):
+            print(f"  {year}: {partition['rows']} rows")
+        return
+
+    summary = (init_store if args.command == "init" else append)(args.source)
+    print(f"Ingested {summary['rows']} rows for years {summary['years'][0]}-{summary['years'][-1]}, "
+          f"{len(summary['countries'])} countries (memory {summary['memory']})")
+    if args.forecast:
+        from .batch_forecast import run_batch
+        run_batch(load_dataset_store())
+
+
+if __name__ == "__main__":
+    main()
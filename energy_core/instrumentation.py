@@ -0,0 +1,141 @@
+#Instrumentation: per-section timing spans for a dashboard run, exported as JSON log lines and Prometheus metrics
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from .data_store import CACHE_DIR, write_atomic
+
+# Output locations (override with ENERGY_TIMING_LOG / ENERGY_METRICS_FILE)
+TIMING_LOG = os.environ.get("ENERGY_TIMING_LOG")
+METRICS_FILE = os.environ.get("ENERGY_METRICS_FILE", os.path.join(CACHE_DIR, "dashboard_metrics.prom"))
+
+logger = logging.getLogger("energy_dashboard.timing")
+if TIMING_LOG and not logger.handlers:
+    os.makedirs(os.path.dirname(os.path.abspath(TIMING_LOG)), exist_ok=True)
+    _handler = logging.FileHandler(TIMING_LOG, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+# Process-wide totals behind the Prometheus file: stage -> counters
+_totals = {}
+_totals_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, name, cache_counts=None):
+        self.name = name
+        self.rows = None
+        self.seconds = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache_counts = cache_counts
+        self._started = time.perf_counter()
+        self._counts_at_start = cache_counts() if cache_counts else (0, 0)
+
+    def stop(self, rows=None):
+        if self.seconds is None:
+            self.seconds = time.perf_counter() - self._started
+            if self._cache_counts:
+                hits, misses = self._cache_counts()
+                self.cache_hits += hits - self._counts_at_start[0]
+                self.cache_misses += misses - self._counts_at_start[1]
+        if rows is not None:
+            self.rows = int(rows)
+        return self
+
+    def as_dict(self):
+        return {
+            "section": self.name,
+            "ms": round(self.seconds * 1000, 3) if self.seconds is not None else None,
+            "rows": self.rows,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+
+class RunTimer:
+    # Collects the spans of one script run; cache_counts() returns the run's cumulative shared cache (hits, misses)
+
+    def __init__(self, cache_counts=None):
+        self.cache_counts = cache_counts
+        self.spans = []
+        self._started = time.perf_counter()
+
+    def start(self, name):
+        span = Span(name, self.cache_counts)
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name):
+        current = self.start(name)
+        try:
+            yield current
+        finally:
+            current.stop()
+
+    def table(self):
+        rows = [span.as_dict() for span in self.spans]
+        rows.append({"section": "total", "ms": round((time.perf_counter() - self._started) * 1000, 3)})
+        return pd.DataFrame(rows)
+
+    def finish(self):
+        # Log the run and fold it into the process totals and the Prometheus file
+        for span in self.spans:
+            span.stop()
+        total_ms = (time.perf_counter() - self._started) * 1000
+        logger.info(json.dumps({
+            "event": "dashboard_run",
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "total_ms": round(total_ms, 3),
+            "spans": [span.as_dict() for span in self.spans],
+        }))
+        with _totals_lock:
+            for span in self.spans:
+                totals = _totals.setdefault(span.name, {"count": 0, "seconds": 0.0, "rows": 0, "hits": 0, "misses": 0})
+                totals["count"] += 1
+                totals["seconds"] += span.seconds
+                totals["rows"] += span.rows or 0
+                totals["hits"] += span.cache_hits
+                totals["misses"] += span.cache_misses
+            write_prometheus(METRICS_FILE)
+
+
+def prometheus_text():
+    lines = [
+        "# HELP dashboard_section_seconds Wall time spent in each dashboard section.",
+        "# TYPE dashboard_section_seconds summary",
+    ]
+    for name, totals in sorted(_totals.items()):
+        lines.append(f'dashboard_section_seconds_sum{{section="{name}"}} {totals["seconds"]:.6f}')
+        lines.append(f'dashboard_section_seconds_count{{section="{name}"}} {totals["count"]}')
+    lines += ["# HELP dashboard_section_rows_total Rows processed by each dashboard section.",
+              "# TYPE dashboard_section_rows_total counter"]
+    for name, totals in sorted(_totals.items()):
+        lines.append(f'dashboard_section_rows_total{{section="{name}"}} {totals["rows"]}')
+    lines += ["# HELP dashboard_section_cache_total Shared cache lookups made by each dashboard section.",
+              "# TYPE dashboard_section_cache_total counter"]
+    for name, totals in sorted(_totals.items()):
+        lines.append(f'dashboard_section_cache_total{{section="{name}",result="hit"}} {totals["hits"]}')
+        lines.append(f'dashboard_section_cache_total{{section="{name}",result="miss"}} {totals["misses"]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    # Textfile-collector format, replaced atomically so scrapers never see a partial file
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        text = prometheus_text()
+
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                handle.write(text)
+        write_atomic(path, write)
+    except OSError as e:
+        logger.warning("Could not write metrics file %s: %s", path, e)
@@ -0,0 +1,158 @@
+#ARIMA order selection: per-country (p, d, q) search by AIC/BIC in a process pool, stored for interactive use
+import argparse
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .batch_forecast import ARIMA_ORDER, _limit_worker_threads, country_series
+from .data_store import CACHE_DIR, load_dataset, read_if_changed, read_json, write_json
+from .forecast_cache import series_fingerprint
+
+ORDERS_PATH = os.path.join(CACHE_DIR, "arima_orders.json")
+# Used for countries without a selected order
+DEFAULT_ORDER = ARIMA_ORDER
+MAX_P, MAX_D, MAX_Q = 3, 2, 3
+ADF_ALPHA = 0.05
+# Stop once this many complexity levels (p + q) in a row fail to improve the best score
+PATIENCE = 2
+
+
+# ------------------ Search ------------------
+def differencing_order(values, max_d=MAX_D, alpha=ADF_ALPHA):
+    # Smallest d for which the ADF test rejects a unit root in the differenced series
+    from statsmodels.tsa.stattools import adfuller
+
+    for d in range(max_d + 1):
+        differenced = np.diff(values, n=d)
+        if len(differenced) < 8 or np.ptp(differenced) == 0:
+            return d
+        try:
+            if adfuller(differenced, autolag="AIC")[1] < alpha:
+                return d
+        except (ValueError, np.linalg.LinAlgError):
+            return d
+    return max_d
+
+
+def candidate_orders(d, n_obs, max_p=MAX_P, max_q=MAX_Q):
+    # (p, d, q) grouped by complexity p + q, cheapest first; orders with too few observations are left out
+    levels = {}
+    for p in range(max_p + 1):
+        for q in range(max_q + 1):
+            if n_obs - d > 2 * (p + q + 1):
+                levels.setdefault(p + q, []).append((p, d, q))
+    return [levels[level] for level in sorted(levels)]
+
+
+def select_order(values, criterion="aic"):
+    # Best order by AIC or BIC; d comes from the ADF test, failed fits prune every larger (p, q) with the same d
+    from statsmodels.tsa.arima.model import ARIMA
+
+    values = np.asarray(values, dtype="float64")
+    d = differencing_order(values)
+    best_order, best_score = None, np.inf
+    failed, fitted, pruned, stale_levels = [], 0, 0, 0
+    levels = candidate_orders(d, len(values))
+    for position, level in enumerate(levels):
+        improved = False
+        for order in level:
+            if any(p <= order[0] and q <= order[2] for p, _, q in failed):
+                pruned += 1
+                continue
+            fitted += 1
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    result = ARIMA(values, order=order).fit()
+                converged = (result.mle_retvals or {}).get("converged", True)
+                score = getattr(result, criterion)
+            except Exception:
+                failed.append(order)
+                continue
+            if not converged or not np.isfinite(score):
+                failed.append(order)
+                continue
+            if score < best_score:
+                best_order, best_score, improved = order, score, True
+        stale_levels = 0 if improved else stale_levels + 1
+        if best_order is not None and stale_levels >= PATIENCE:
+            pruned += sum(len(rest) for rest in levels[position + 1:])
+            break
+
+    return {
+        "order": list(best_order or DEFAULT_ORDER),
+        "score": float(best_score) if best_order else None,
+        "fitted": fitted,
+        "pruned": pruned,
+        "failed": len(failed),
+    }
+
+
+# ------------------ Stored orders ------------------
+def load_orders(path=ORDERS_PATH):
+    return read_if_changed(path, lambda path: (read_json(path) or {}).get("countries", {}), missing={})
+
+
+def stored_order(orders, country):
+    entry = orders.get(str(country))
+    return tuple(entry["order"]) if entry else DEFAULT_ORDER
+
+
+def _write_orders(criterion, countries):
+    os.makedirs(os.path.dirname(ORDERS_PATH), exist_ok=True)
+    write_json({"criterion": criterion, "updated": time.strftime("%Y-%m-%dT%H:%M:%S"), "countries": countries},
+               ORDERS_PATH)
+
+
+# ------------------ Command line ------------------
+def run_selection(df, criterion="aic", workers=None, resume=True):
+    series_by_country = country_series(df)
+    previous = load_orders() if resume else {}
+    orders, todo = {}, []
+    for country in sorted(series_by_country):
+        fingerprint = series_fingerprint(series_by_country[country])
+        entry = previous.get(str(country))
+        if entry and entry["fingerprint"] == fingerprint and entry["criterion"] == criterion:
+            orders[str(country)] = entry
+        else:
+            todo.append((country, fingerprint))
+
+    print(f"{len(series_by_country)} countries, {len(orders)} up to date, {len(todo)} to search")
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_limit_worker_threads) as pool:
+        futures = {
+            pool.submit(select_order, series_by_country[country].to_numpy(), criterion): (country, fingerprint)
+            for country, fingerprint in todo
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            country, fingerprint = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"[{done}/{len(todo)}] {country} failed: {type(e).__name__}: {e}", flush=True)
+                continue
+            orders[str(country)] = {**result, "criterion": criterion, "fingerprint": fingerprint}
+            print(f"[{done}/{len(todo)}] {country} {tuple(result['order'])} "
+                  f"({result['fitted']} fitted, {result['pruned']} pruned, {time.perf_counter() - started:.1f}s)",
+                  flush=True)
+
+    _write_orders(criterion, orders)
+    print(f"Wrote orders for {len(orders)} countries to {ORDERS_PATH}")
+    return orders
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Select an ARIMA order per country by AIC/BIC.")
+    parser.add_argument("source", help="Path to the source Excel workbook")
+    parser.add_argument("--criterion", choices=["aic", "bic"], default="aic")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--no-resume", action="store_true", help="Search every country again")
+    args = parser.parse_args(argv)
+    run_selection(load_dataset(args.source), args.criterion, args.workers, resume=not args.no_resume)
+
+
+if __name__ == "__main__":
+    main()
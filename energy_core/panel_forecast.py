@@ -0,0 +1,140 @@
+#Panel forecasts: AR(p) on first differences fitted for many countries at once with NumPy
+import argparse
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+AR_LAGS = 2
+RIDGE = 1e-8  # Keeps the normal equations solvable for flat or very short series
+
+
+def country_panel(df, countries=None, cutoff=None):
+    # Years x countries matrix of primary energy consumption, NaN where a country has no data
+    if countries is not None:
+        df = df[df["Country"].isin(countries)]
+    if cutoff is not None:
+        df = df[df["Year"] <= cutoff]
+    panel = df.groupby(["Year", "Country"], observed=True)["primary_energy_consumption"].sum().unstack()
+    if countries is not None:
+        panel = panel.reindex(columns=[c for c in countries if c in panel.columns])
+    return panel
+
+
+def _lagged_design(diffs, lags):
+    # diffs: (countries, T) -> targets (countries, N), design (countries, N, lags + 1), row mask
+    n = diffs.shape[1] - lags
+    targets = diffs[:, lags:]
+    columns = [np.ones_like(targets)] + [diffs[:, lags - k:lags - k + n] for k in range(1, lags + 1)]
+    design = np.stack(columns, axis=2)
+    mask = np.isfinite(targets) & np.isfinite(design).all(axis=2)
+    return targets, design, mask
+
+
+def fit_ar_panel(values, lags=AR_LAGS):
+    # Least-squares AR(lags) with drift on differenced series, solved for all countries in one batch;
+    # returns coefficients (countries, lags + 1) and a mask of countries with enough observations
+    diffs = np.diff(np.asarray(values, dtype="float64"), axis=1)
+    targets, design, mask = _lagged_design(diffs, lags)
+    weights = mask.astype("float64")
+    design = np.where(mask[..., None], design, 0.0)
+    targets = np.where(mask, targets, 0.0)
+
+    xtx = np.einsum("cnk,cnj,cn->ckj", design, design, weights)
+    xty = np.einsum("cnk,cn,cn->ck", design, targets, weights)
+    xtx += RIDGE * np.eye(lags + 1)
+    coefficients = np.linalg.solve(xtx, xty[..., None])[..., 0]
+
+    valid = weights.sum(axis=1) >= lags + 2
+    return coefficients, valid
+
+
+def _align_ends(values):
+    # Shifts each row right so its last finite value sits in the last column (NaN fills the start); a country that
+    # stopped reporting early is then forecast from its own last value and lags rather than from trailing NaN
+    columns = values.shape[1]
+    finite = np.isfinite(values)
+    shift = np.where(finite.any(axis=1), np.argmax(finite[:, ::-1], axis=1), 0)
+    source = np.arange(columns)[None, :] - shift[:, None]
+    return np.where(source >= 0, np.take_along_axis(values, np.maximum(source, 0), axis=1), np.nan)
+
+
+def forecast_ar_panel(values, steps, lags=AR_LAGS):
+    # values: (countries, T) ending at the cutoff year -> forecasts (countries, steps), each row covering the `steps`
+    # years after that country's last finite value
+    values = _align_ends(np.asarray(values, dtype="float64"))
+    coefficients, valid = fit_ar_panel(values, lags)
+    diffs = np.diff(values, axis=1)
+    history = diffs[:, -lags:][:, ::-1].copy()  # Most recent difference first
+    level = values[:, -1].copy()
+
+    forecasts = np.empty((values.shape[0], steps))
+    for step in range(steps):
+        step_diff = coefficients[:, 0] + np.einsum("ck,ck->c", coefficients[:, 1:], history)
+        level += step_diff
+        forecasts[:, step] = level
+        history = np.concatenate([step_diff[:, None], history[:, :-1]], axis=1)
+
+    valid &= np.isfinite(forecasts).all(axis=1)
+    forecasts[~valid] = np.nan
+    return forecasts
+
+
+def forecast_panel(panel, steps, lags=AR_LAGS):
+    # panel: Years x countries frame from country_panel -> future years x countries frame; the index is the years
+    # after the panel's end, so label a country whose data ends earlier with pipeline.forecast_years
+    forecasts = forecast_ar_panel(panel.to_numpy().T, steps, lags)
+    future_years = np.arange(panel.index.max() + 1, panel.index.max() + 1 + steps)
+    return pd.DataFrame(forecasts.T, index=pd.Index(future_years, name="Year"), columns=panel.columns)
+
+
+def reference_forecasts(panel, steps, order=(2, 1, 2)):
+    # statsmodels ARIMA fitted country by country, for checking the panel engine's accuracy
+    from .forecast_cache import fit_arima_forecast
+
+    columns = {}
+    for country in panel.columns:
+        series = panel[country].dropna()
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                columns[country] = fit_arima_forecast(series, order, steps)
+        except Exception:
+            columns[country] = np.full(steps, np.nan)
+    future_years = np.arange(panel.index.max() + 1, panel.index.max() + 1 + steps)
+    return pd.DataFrame(columns, index=pd.Index(future_years, name="Year"))
+
+
+def main(argv=None):
+    from .data_store import load_dataset
+
+    parser = argparse.ArgumentParser(description="Compare the panel AR engine with statsmodels ARIMA.")
+    parser.add_argument("source", help="Path to the source Excel workbook")
+    parser.add_argument("--holdout", type=int, default=5, help="Years held out for scoring (default 5)")
+    parser.add_argument("--lags", type=int, default=AR_LAGS)
+    args = parser.parse_args(argv)
+
+    panel = country_panel(load_dataset(args.source))
+    train = panel.iloc[:-args.holdout]
+    actual = panel.iloc[-args.holdout:].to_numpy()
+
+    started = time.perf_counter()
+    panel_result = forecast_panel(train, args.holdout, args.lags)
+    panel_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    reference = reference_forecasts(train, args.holdout)
+    reference_seconds = time.perf_counter() - started
+
+    for name, result, seconds in [("Panel AR", panel_result, panel_seconds),
+                                  ("ARIMA", reference[panel.columns], reference_seconds)]:
+        errors = np.abs(result.to_numpy() - actual)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # Countries without a forecast
+            mae = np.nanmedian(np.nanmean(errors, axis=0))
+        print(f"{name:>8}: {seconds * 1000:9.1f} ms for {panel.shape[1]} countries, "
+              f"median hold-out MAE {mae:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#Pipeline: the steps behind each dashboard section as plain functions, usable without Streamlit
+import os
+
+import numpy as np
+
+from .backends import BACKEND, DuckDBBackend, PandasBackend
+from .batch_forecast import stored_forecast
+from .data_store import cached_parquet, dataset_version, load_dataset
+from .forecast_cache import cached_forecast
+from .gaps import MIN_FORECAST_YEARS
+from .ingest import (dataset_store_files, dataset_store_version, has_dataset_store, load_dataset_store,
+                     load_store_rollups)
+from .order_selection import load_orders, stored_order
+from .panel_forecast import forecast_panel
+from .query_index import index_for
+from .rollup_cube import cube_for
+from .scenarios import path_multipliers
+
+# Most countries per forecast: ARIMA fits one model per country, the panel engine fits them all in one batch
+MAX_FORECAST_COUNTRIES = {"arima": 2, "panel": 24}
+# Years forecast after each country's last report; part of the forecast cache key, so the dashboard, the API and the
+# snapshot export must agree on it for the export to warm the cache the others read
+FORECAST_STEPS = 5
+
+
+# ------------------ Loading ------------------
+def dataset_source(file_path):
+    # (use_store, version): the ingested dataset store when one exists, otherwise the source workbook
+    if has_dataset_store():
+        return True, dataset_store_version()
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(file_path)
+    return False, dataset_version(file_path)
+
+
+def load_bundle(file_path, version, from_store):
+    # Dataset plus its rollup cube (pre-aggregated (Year, Region, Country) sums) and (Region, Year)/Country index
+    if from_store:
+        # The store keeps its rollups up to date per partition, so the cube skips the groupby
+        data = load_dataset_store()
+        return data, cube_for(data, version, rollups=load_store_rollups()), index_for(data, version)
+    data = load_dataset(file_path)
+    return data, cube_for(data, version), index_for(data, version)
+
+
+def load_backend(file_path, version, from_store, kind=BACKEND):
+    # The query backend for the filtering and aggregation stages: the in-memory bundle, or DuckDB reading the
+    # Parquet files in place (the store's year partitions, or the workbook's Parquet cache)
+    if kind == "duckdb":
+        if from_store:
+            return DuckDBBackend(dataset_store_files(), union_by_name=True)
+        return DuckDBBackend([cached_parquet(file_path)])
+    if kind != "pandas":
+        raise ValueError(f"Unknown backend: {kind} (expected pandas or duckdb)")
+    return PandasBackend(*load_bundle(file_path, version, from_store))
+
+
+# ------------------ Filtering ------------------
+def filter_selection(backend, version, regions, year_range):
+    # Matching row count and the shared-cache key for a region/year selection
+    return backend.count(regions, year_range), (version, tuple(sorted(regions)), tuple(year_range))
+
+
+# ------------------ Forecasting ------------------
+def history_series(history, country, last_year):
+    # One country's cleaned history up to last_year, without the years before its first or after its last report
+    return history[country].loc[history.index <= last_year].dropna()
+
+
+def too_short_to_forecast(history, countries, last_year, min_years=MIN_FORECAST_YEARS):
+    # {country: reason} for the countries with fewer than min_years in the selected range; the dashboard, the API and
+    # the snapshot export leave them out instead of fitting a model on a handful of points
+    short = {}
+    for country in countries:
+        years = len(history_series(history, country, last_year))
+        if years < min_years:
+            short[country] = f"needs at least {min_years} years of data in the selected range, has {years}"
+    return short
+
+
+def forecast_years(history, country, last_year, steps):
+    # The `steps` years after the country's last reported year (up to last_year): a country that stopped reporting
+    # earlier, or a history cut short by the year filter, is forecast from where its series ends
+    end = int(history_series(history, country, last_year).index[-1])
+    return np.arange(end + 1, end + 1 + steps)
+
+
+def complete_forecasts(forecasts):
+    # ({country: forecast} with a value for every year, [countries whose forecast came back with NaN]); the panel
+    # engine returns NaN for a country with too few reported years to fit its lags
+    complete = {country: values for country, values in forecasts.items() if np.isfinite(values).all()}
+    return complete, [country for country in forecasts if country not in complete]
+
+
+def country_forecasts(history, countries, last_year, steps, panel_engine=False, forecast_store=None):
+    # Unscaled forecasts for the `steps` years after last_year, per country; history is the cleaned
+    # years x countries table from CleanPanel.history (interior gaps interpolated, NaN outside the reported years)
+    if panel_engine:
+        # One batched fit for all countries; NaN years are masked out of the regression
+        panel_forecasts = forecast_panel(history.loc[history.index <= last_year, list(countries)], steps=steps)
+        return {country: panel_forecasts[country].to_numpy() for country in countries}
+
+    forecasts = {}
+    orders = load_orders()  # Selected nightly by order_selection.py
+    for country in countries:
+        # Use the precomputed batch forecast when it was fitted on the same series and order, otherwise
+        # the fit cache (keyed per country/cutoff/order/data, so the growth sliders only rescale it)
+        series = history_series(history, country, last_year)
+        order = stored_order(orders, country)
+        forecast = stored_forecast(forecast_store, country, series, steps=steps, order=order)
+        if forecast is None:
+            forecast = cached_forecast(country, series, cutoff=last_year, order=order, steps=steps)
+        forecasts[country] = forecast
+    return forecasts
+
+
+def request_forecasts(history, countries, last_year, steps, jobs, forecast_store=None):
+    # Non-blocking ARIMA forecasts: ({country: forecast} ready now, {country: job_id} still fitting or failed)
+    forecasts, pending = {}, {}
+    orders = load_orders()
+    for country in countries:
+        series = history_series(history, country, last_year)
+        order = stored_order(orders, country)
+        forecast = stored_forecast(forecast_store, country, series, steps=steps, order=order)
+        if forecast is None:
+            job_id = jobs.submit(country, series, cutoff=last_year, order=order, steps=steps)
+            forecast = jobs.result(job_id)
+            if forecast is None:
+                pending[country] = job_id
+                continue
+        forecasts[country] = forecast
+    return forecasts, pending
+
+
+def apply_growth(forecast, gdp_growth, population_growth):
+    # Scale a forecast by projected GDP and population growth, both in percent per year and compounded over the
+    # horizon: the constant-rate path of the scenario fan chart, so the line matches its zero-volatility median
+    forecast = np.asarray(forecast, dtype="float64")
+    horizon = (1, len(forecast))
+    return forecast * path_multipliers(np.full(horizon, gdp_growth), np.full(horizon, population_growth))[0]
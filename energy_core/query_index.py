@@ -0,0 +1,84 @@
+#Query index: sorted (Region, Year) and Country lookups that return row positions instead of scanning masks
+import numpy as np
+import pandas as pd
+
+
+class FrameIndex:
+    # A (Region, Year) sort order over the shared dataset, kept as a row permutation rather than a sorted copy of
+    # the frame; filters resolve to ranges of that permutation with searchsorted
+
+    def __init__(self, df):
+        region_codes, self.regions = pd.factorize(df["Region"], sort=True)
+        years = df["Year"].to_numpy()
+        order = np.lexsort((years, region_codes))
+
+        self.frame = df
+        self.order = order
+        self.region_codes = region_codes[order]
+        self.years = years[order]
+        self.region_bounds = np.searchsorted(self.region_codes, np.arange(len(self.regions) + 1))
+
+        country_codes, self.countries = pd.factorize(df["Country"].take(order), sort=True)
+        self.country_codes = country_codes
+        self.country_rows = np.argsort(country_codes, kind="stable")
+        self.country_bounds = np.searchsorted(country_codes[self.country_rows], np.arange(len(self.countries) + 1))
+
+        # Position of each country's first row in the source file, to keep dropdowns in file order
+        first_seen = pd.Series(np.arange(len(df)), index=df["Country"].to_numpy()).groupby(level=0).min()
+        self.country_rank = first_seen.reindex(self.countries).to_numpy()
+
+    def _codes(self, labels, categories):
+        codes = categories.get_indexer(pd.Index(list(labels)))
+        return np.sort(codes[codes >= 0])
+
+    def rows(self, regions, year_range, countries=None):
+        # Sorted row positions matching the regions, the inclusive year range and, optionally, the countries
+        if countries is not None:
+            return self._country_rows(regions, year_range, countries)
+        ranges = []
+        for code in self._codes(regions, self.regions):
+            start, end = self.region_bounds[code], self.region_bounds[code + 1]
+            block = self.years[start:end]
+            ranges.append((start + np.searchsorted(block, year_range[0], "left"),
+                           start + np.searchsorted(block, year_range[1], "right")))
+        if not ranges:
+            return np.empty(0, dtype="int64")
+        return np.concatenate([np.arange(lo, hi) for lo, hi in ranges])
+
+    def _country_rows(self, regions, year_range, countries):
+        region_codes = self._codes(regions, self.regions)
+        parts = []
+        for code in self._codes(countries, self.countries):
+            rows = self.country_rows[self.country_bounds[code]:self.country_bounds[code + 1]]
+            years = self.years[rows]
+            keep = (years >= year_range[0]) & (years <= year_range[1]) & np.isin(self.region_codes[rows], region_codes)
+            parts.append(rows[keep])
+        if not parts:
+            return np.empty(0, dtype="int64")
+        return np.sort(np.concatenate(parts))
+
+    def take(self, rows):
+        # Only the selected rows are copied out of the shared frame, in (Region, Year) order
+        return self.frame.take(self.order[rows]).reset_index(drop=True)
+
+    def select(self, regions, year_range, countries=None):
+        return self.take(self.rows(regions, year_range, countries))
+
+    def countries_in(self, rows, exclude=()):
+        # Countries present in the rows, in the order they first appear in the source file
+        codes = np.unique(self.country_codes[rows])
+        codes = codes[np.argsort(self.country_rank[codes], kind="stable")]
+        names = self.countries[codes]
+        return names[~names.isin(list(exclude))].to_numpy()
+
+
+_indexes = {}
+
+
+def index_for(df, version):
+    # One index per dataset version, shared by every rerun in the process
+    index = _indexes.get(version)
+    if index is None:
+        _indexes.clear()
+        index = _indexes[version] = FrameIndex(df)
+    return index
@@ -0,0 +1,138 @@
+#Rollup cube: (Year, Region, Country) sums and counts built once per dataset version
+import numpy as np
+import pandas as pd
+
+ENERGY_SOURCES = ["oilcons_ej", "coalcons_ej", "gascons_ej", "ren_power_ej"]
+MEASURES = ["primary_energy_consumption", "gdp", "population"] + ENERGY_SOURCES
+
+
+def rollup_frame(df):
+    # (Year, Region, Country) row counts plus per-measure sums and non-null counts; the cube is built from this
+    grouped = df.groupby(["Year", "Region", "Country"], observed=True)
+    rollups = grouped.size().rename("rows").to_frame()
+    for measure in MEASURES:
+        if measure in df.columns:
+            rollups[f"{measure}_sum"] = grouped[measure].sum()
+            rollups[f"{measure}_count"] = grouped[measure].count()
+    return rollups.reset_index()
+
+
+class RollupCube:
+    # Dense (years x region/country) arrays; columns are sorted by region so each region is one contiguous block
+
+    def __init__(self, rollups):
+        keys = rollups[["Region", "Country"]].drop_duplicates().sort_values(["Region", "Country"])
+        self.column_regions = keys["Region"].to_numpy()
+        self.column_countries = keys["Country"].to_numpy()
+        # Blocks start wherever the region changes: categorical regions sort in category order, which for the
+        # dataset store is the order partitions first saw them rather than alphabetical
+        changes = self.column_regions[1:] != self.column_regions[:-1]
+        block_starts = np.flatnonzero(np.append(len(keys) > 0, changes))
+        self.regions = self.column_regions[block_starts]
+        self.region_blocks = dict(zip(self.regions, zip(block_starts, np.append(block_starts[1:], len(keys)))))
+
+        self.years = np.sort(rollups["Year"].unique())
+        column = pd.MultiIndex.from_frame(keys).get_indexer(pd.MultiIndex.from_frame(rollups[["Region", "Country"]]))
+        year = np.searchsorted(self.years, rollups["Year"].to_numpy())
+        cell = year * len(keys) + column
+        shape = (len(self.years), len(keys))
+        size = shape[0] * shape[1]
+
+        def spread(column_name):
+            weights = rollups[column_name].to_numpy(dtype="float64")
+            return np.bincount(cell, weights=weights, minlength=size).reshape(shape)
+
+        self.rows = spread("rows").astype("int64")
+        self.sums, self.counts = {}, {}
+        for measure in MEASURES:
+            if f"{measure}_sum" in rollups.columns:
+                self.sums[measure] = spread(f"{measure}_sum")
+                self.counts[measure] = spread(f"{measure}_count").astype("int64")
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(rollup_frame(df))
+
+    # ------------------ Selection helpers ------------------
+    def _year_slice(self, start, end):
+        return slice(np.searchsorted(self.years, start, "left"), np.searchsorted(self.years, end, "right"))
+
+    def _blocks(self, regions):
+        wanted = set(regions)
+        return [(region, *self.region_blocks[region]) for region in self.regions if region in wanted]
+
+    # ------------------ Queries used by the dashboard ------------------
+    def trend(self, regions, year_range):
+        # Same result as final_data.groupby(["Year", "Region"]).agg(sum energy, mean gdp, mean population)
+        years = self._year_slice(*year_range)
+        frames = []
+        for region, start, end in self._blocks(regions):
+            block = np.s_[years, start:end]
+            rows = self.rows[block].sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                frame = pd.DataFrame({
+                    "Year": self.years[years],
+                    "Region": region,
+                    "primary_energy_consumption": self.sums["primary_energy_consumption"][block].sum(axis=1),
+                    "gdp": self.sums["gdp"][block].sum(axis=1) / self.counts["gdp"][block].sum(axis=1),
+                    "population": self.sums["population"][block].sum(axis=1) / self.counts["population"][block].sum(axis=1),
+                })
+            frames.append(frame[rows > 0])
+        if not frames:
+            return pd.DataFrame(columns=["Year", "Region", "primary_energy_consumption", "gdp", "population"])
+        return pd.concat(frames).sort_values(["Year", "Region"]).reset_index(drop=True)
+
+    def source_totals(self, regions, year_range):
+        # Total consumption per energy source over the selection
+        years = self._year_slice(*year_range)
+        totals = {source: 0.0 for source in ENERGY_SOURCES}
+        for _, start, end in self._blocks(regions):
+            for source in ENERGY_SOURCES:
+                totals[source] += self.sums[source][years, start:end].sum()
+        return pd.Series(totals)
+
+    def top_countries(self, regions, year_range, n=3):
+        # Top n countries by summed energy consumption within each selected region
+        years = self._year_slice(*year_range)
+        frames = []
+        for region, start, end in self._blocks(regions):
+            present = self.rows[years, start:end].sum(axis=0) > 0
+            frames.append(pd.DataFrame({
+                "Region": region,
+                "Country": self.column_countries[start:end][present],
+                "primary_energy_consumption": self.sums["primary_energy_consumption"][years, start:end].sum(axis=0)[present],
+            }))
+        if not frames:
+            return pd.DataFrame(columns=["Region", "Country", "primary_energy_consumption"])
+        ranked = pd.concat(frames).sort_values("primary_energy_consumption", ascending=False)
+        return ranked.groupby("Region", sort=False).head(n).reset_index(drop=True)
+
+    def region_totals(self, regions, year):
+        # Per-region totals for a single year, with the number of reporting countries
+        position = np.searchsorted(self.years, year)
+        records = []
+        if position < len(self.years) and self.years[position] == year:
+            for region, start, end in self._blocks(regions):
+                present = self.rows[position, start:end] > 0
+                if present.any():
+                    records.append({
+                        "Region": region,
+                        "total_gdp": self.sums["gdp"][position, start:end].sum(),
+                        "total_population": self.sums["population"][position, start:end].sum(),
+                        "total_energy_consumption": self.sums["primary_energy_consumption"][position, start:end].sum(),
+                        "number_of_countries": int(present.sum()),
+                    })
+        return pd.DataFrame(records, columns=["Region", "total_gdp", "total_population",
+                                              "total_energy_consumption", "number_of_countries"])
+
+
+_cubes = {}
+
+
+def cube_for(df, version, rollups=None):
+    # One cube per dataset version, shared by every rerun in the process; pass stored rollups to skip the groupby
+    cube = _cubes.get(version)
+    if cube is None:
+        _cubes.clear()
+        cube = _cubes[version] = RollupCube(rollups) if rollups is not None else RollupCube.from_frame(df)
+    return cube
@@ -0,0 +1,45 @@
+#Scenarios: thousands of GDP/population growth paths applied to base forecasts in one NumPy broadcast
+import numpy as np
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def monte_carlo_paths(gdp_growth, population_growth, gdp_volatility, population_volatility, n_paths, horizon,
+                      seed=0):
+    # Year-varying growth rates in percent, (n_paths, horizon) each, drawn around the given means
+    rng = np.random.default_rng(seed)
+    gdp = rng.normal(gdp_growth, gdp_volatility, (n_paths, horizon))
+    population = rng.normal(population_growth, population_volatility, (n_paths, horizon))
+    return gdp, population
+
+
+def grid_paths(gdp_growth, population_growth, gdp_volatility, population_volatility, n_paths, horizon, spread=2.0):
+    # Constant-rate paths on an evenly spaced grid of mean +/- spread * volatility for both rates
+    side = max(int(np.sqrt(n_paths)), 1)
+    gdp_levels = np.linspace(gdp_growth - spread * gdp_volatility, gdp_growth + spread * gdp_volatility, side)
+    population_levels = np.linspace(population_growth - spread * population_volatility,
+                                    population_growth + spread * population_volatility, side)
+    gdp, population = (levels.reshape(-1) for levels in np.meshgrid(gdp_levels, population_levels))
+    return np.repeat(gdp[:, None], horizon, axis=1), np.repeat(population[:, None], horizon, axis=1)
+
+
+def path_multipliers(gdp_rates, population_rates):
+    # Compounded growth factor of each path for each forecast year: (paths, horizon)
+    return np.cumprod((1 + gdp_rates / 100) * (1 + population_rates / 100), axis=1)
+
+
+def simulate(base, gdp_rates, population_rates):
+    # Every path applied to every base forecast: (countries, horizon) -> (countries, paths, horizon)
+    return np.asarray(base, dtype="float64")[:, None, :] * path_multipliers(gdp_rates, population_rates)[None, :, :]
+
+
+def fan_bands(base, gdp_rates, population_rates, percentiles=PERCENTILES):
+    # Percentiles of simulate() over the paths: (countries, len(percentiles), horizon). Scaling by a fixed base
+    # keeps the paths in order (reversed when the base is negative), so the percentiles are taken once over the
+    # multipliers instead of once per country
+    multipliers = path_multipliers(gdp_rates, population_rates)
+    percentiles = np.asarray(percentiles, dtype="float64")
+    bands = np.percentile(multipliers, percentiles, axis=0)[None, :, :]
+    mirrored = np.percentile(multipliers, 100 - percentiles, axis=0)[None, :, :]
+    base = np.asarray(base, dtype="float64")[:, None, :]
+    return np.where(base >= 0, base * bands, base * mirrored)
@@ -0,0 +1,82 @@
+#Dataset schema: validates the columns the dashboard relies on and stores them in compact dtypes
+import numpy as np
+import pandas as pd
+
+# Columns the dashboard reads, with the kind of data expected in each
+REQUIRED_COLUMNS = {
+    "Country": "category",
+    "Region": "category",
+    "Year": "integer",
+    "primary_energy_consumption": "float",
+    "gdp": "float",
+    "population": "number",
+    "oilcons_ej": "float",
+    "coalcons_ej": "float",
+    "gascons_ej": "float",
+    "ren_power_ej": "float",
+}
+
+# Other text columns are stored as categoricals when at most this share of their values is unique
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Bump when the stored representation changes so existing caches are rebuilt
+SCHEMA_VERSION = 1
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def validate(df):
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise SchemaError(f"Dataset is missing required columns: {', '.join(missing)}")
+    for column, kind in REQUIRED_COLUMNS.items():
+        if kind != "category" and not pd.api.types.is_numeric_dtype(df[column]):
+            raise SchemaError(f"Column '{column}' must be numeric, found {df[column].dtype}")
+    if df["Year"].isna().any() or (df["Year"] % 1 != 0).any():
+        raise SchemaError("Column 'Year' must contain whole years")
+
+
+def _downcast_float(series):
+    # float32 only when every value survives the round trip unchanged
+    candidate = series.astype("float32")
+    if np.array_equal(candidate.to_numpy(dtype="float64"), series.to_numpy(dtype="float64"), equal_nan=True):
+        return candidate
+    return series
+
+
+def _downcast_integer(series):
+    if series.isna().any() or (series % 1 != 0).any():
+        return series
+    return pd.to_numeric(series.astype("int64"), downcast="integer")
+
+
+def compact(df):
+    # Returns the dataset in compact dtypes and a memory report; raises SchemaError if it is unusable
+    validate(df)
+    before = int(df.memory_usage(deep=True).sum())
+
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        kind = REQUIRED_COLUMNS.get(column)
+        if kind == "category" or (
+            series.dtype == object and series.nunique(dropna=True) <= CATEGORY_MAX_UNIQUE_RATIO * len(series)
+        ):
+            series = series.astype("category")
+        elif kind == "integer" or pd.api.types.is_integer_dtype(series):
+            series = _downcast_integer(series)
+        elif pd.api.types.is_float_dtype(series):
+            series = _downcast_float(series)
+        columns[column] = series
+
+    compacted = pd.DataFrame(columns)
+    after = int(compacted.memory_usage(deep=True).sum())
+    report = {"memory_before": before, "memory_after": after, "schema_version": SCHEMA_VERSION}
+    return compacted, report
+
+
+def describe_report(report):
+    before, after = report["memory_before"], report["memory_after"]
+    return f"{before / 1024 ** 2:.2f} MB -> {after / 1024 ** 2:.2f} MB ({1 - after / max(before, 1):.0%} smaller)"
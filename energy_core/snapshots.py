@@ -0,0 +1,297 @@
+#Snapshots: the default view and common filter combinations exported once per dataset version and served from disk
+import argparse
+import hashlib
+import html
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+from .data_store import CACHE_DIR, read_json
+from .figures import bubble_figure, forecast_figure, sources_figure, top_countries_figure, trend_figure
+
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "snapshots")
+AGGREGATES = ("trends", "sources", "top_countries", "region_totals")
+
+
+def view_key(regions, year_range):
+    return json.dumps([sorted(map(str, regions)), [int(year) for year in year_range]])
+
+
+def _view_directory(key):
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+# ------------------ Rendering ------------------
+def render_view(backend, regions, year_range):
+    # Aggregates and figures of the overview and economic impact sections for one selection, as the dashboard
+    # draws them
+    final_year = year_range[1]
+    aggregates = {
+        "trends": backend.trend(regions, year_range),
+        "sources": backend.source_totals(regions, year_range),
+        "top_countries": backend.top_countries(regions, year_range, n=3),
+        "region_totals": backend.region_totals(regions, final_year),
+    }
+    figures = {
+        "trends": trend_figure(aggregates["trends"]),
+        "sources": sources_figure(aggregates["sources"]),
+        "top_countries": top_countries_figure(aggregates["top_countries"]),
+        "gdp_bubbles": bubble_figure(aggregates["region_totals"], "total_gdp", "GDP", final_year),
+        "population_bubbles": bubble_figure(aggregates["region_totals"], "total_population", "Population",
+                                            final_year),
+    }
+    return {
+        "rows": backend.count(regions, year_range),
+        "countries": [str(country) for country in backend.countries(regions, year_range)],
+        "aggregates": aggregates,
+        "figures": figures,
+    }
+
+
+def _write_view(directory, view):
+    os.makedirs(directory, exist_ok=True)
+    for name, frame in view["aggregates"].items():
+        if isinstance(frame, pd.Series):
+            frame = frame.rename_axis("source").reset_index(name="consumption")
+        frame.to_parquet(os.path.join(directory, f"{name}.parquet"), index=False)
+    with open(os.path.join(directory, "figures.json"), "w", encoding="utf-8") as handle:
+        json.dump({name: figure.to_json() for name, figure in view["figures"].items()}, handle)
+
+
+def _read_view(directory):
+    aggregates = {name: pd.read_parquet(os.path.join(directory, f"{name}.parquet")) for name in AGGREGATES}
+    aggregates["sources"] = aggregates["sources"].set_index("source")["consumption"].rename_axis(None)
+    with open(os.path.join(directory, "figures.json"), "r", encoding="utf-8") as handle:
+        figures = {name: pio.from_json(text) for name, text in json.load(handle).items()}
+    return aggregates, figures
+
+
+# ------------------ Serving ------------------
+class SnapshotBackend:
+    # Answers the exported selections from their snapshot; any other query goes to the live backend, which is only
+    # loaded the first time one is needed
+
+    name = "snapshot"
+
+    def __init__(self, directory, manifest, load_live):
+        self.directory = directory
+        self.manifest = manifest
+        self._load_live = load_live
+        self._live = None
+        self._views = {}
+        self._lock = threading.Lock()
+        # region_totals is asked for by (regions, final year) rather than by year range
+        self._final_years = {}
+        for key in manifest["views"]:
+            regions, years = json.loads(key)
+            self._final_years[(tuple(regions), years[1])] = key
+
+    @property
+    def live(self):
+        with self._lock:
+            if self._live is None:
+                self._live = self._load_live()
+        return self._live
+
+    def _view(self, key):
+        entry = self.manifest["views"].get(key)
+        if entry is None:
+            return None
+        view = self._views.get(key)
+        if view is None:
+            aggregates, figures = _read_view(os.path.join(self.directory, entry["directory"]))
+            view = self._views[key] = {**entry, "aggregates": aggregates, "figures": figures}
+        return view
+
+    def view(self, regions, year_range):
+        return self._view(view_key(regions, year_range))
+
+    def prime(self, regions, year_range, filter_key, cache):
+        # Puts an exported selection's figures into the shared cache under the keys the dashboard reads
+        view = self.view(regions, year_range)
+        for name, figure in (view["figures"] if view else {}).items():
+            if cache.get("figures", (name, filter_key)) is None:
+                cache.put("figures", (name, filter_key), figure)
+        return view is not None
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+    def regions(self):
+        return list(self.manifest["regions"])
+
+    def year_bounds(self):
+        return tuple(self.manifest["year_bounds"])
+
+    # ------------------ Filtering ------------------
+    def count(self, regions, year_range):
+        view = self.view(regions, year_range)
+        return view["rows"] if view else self.live.count(regions, year_range)
+
+    def countries(self, regions, year_range, exclude=()):
+        view = self.view(regions, year_range)
+        if view is None:
+            return self.live.countries(regions, year_range, exclude=exclude)
+        exclude = set(map(str, exclude))
+        return np.array([country for country in view["countries"] if country not in exclude], dtype=object)
+
+    def select(self, regions, year_range, countries=None):
+        return self.live.select(regions, year_range, countries=countries)
+
+    def country_year_totals(self):
+        return self.live.country_year_totals()
+
+    # ------------------ Aggregates ------------------
+    def trend(self, regions, year_range):
+        view = self.view(regions, year_range)
+        return view["aggregates"]["trends"] if view else self.live.trend(regions, year_range)
+
+    def source_totals(self, regions, year_range):
+        view = self.view(regions, year_range)
+        return view["aggregates"]["sources"] if view else self.live.source_totals(regions, year_range)
+
+    def top_countries(self, regions, year_range, n=3):
+        view = self.view(regions, year_range) if n == 3 else None
+        return view["aggregates"]["top_countries"] if view else self.live.top_countries(regions, year_range, n=n)
+
+    def region_totals(self, regions, year):
+        key = self._final_years.get((tuple(sorted(map(str, regions))), int(year)))
+        view = self._view(key) if key else None
+        return view["aggregates"]["region_totals"] if view else self.live.region_totals(regions, year)
+
+
+def snapshot_directory(version):
+    return os.path.join(SNAPSHOT_DIR, str(version))
+
+
+def open_snapshot(version, load_live):
+    # SnapshotBackend when views were exported for this dataset version, otherwise the live backend
+    directory = snapshot_directory(version)
+    manifest = read_json(os.path.join(directory, "manifest.json"))
+    if manifest is None or manifest.get("version") != version:
+        return load_live()
+    return SnapshotBackend(directory, manifest, load_live)
+
+
+# ------------------ Export ------------------
+def _html_page(title, figures):
+    parts = [f"<h2>{html.escape(title)}</h2>"]
+    for position, figure in enumerate(figures):
+        parts.append(pio.to_html(figure, full_html=False, include_plotlyjs="cdn" if position == 0 else False))
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head>"
+            f"<body>{''.join(parts)}</body></html>")
+
+
+def export_snapshots(source_path, views=(), html_dir=None):
+    # Renders the default view (all regions, every year, first forecastable country) plus `views`, each a dict with
+    # optional "regions", "years" and "countries", and fits their forecasts into the forecast cache
+    from .batch_forecast import load_forecast_store
+    from .gaps import clean_panel_for
+    from .pipeline import (FORECAST_STEPS, apply_growth, complete_forecasts, country_forecasts, dataset_source,
+                           forecast_years, load_backend, too_short_to_forecast)
+
+    from_store, version = dataset_source(source_path)
+    backend = load_backend(source_path, version, from_store)
+    all_regions = [str(region) for region in backend.regions()]
+    first_year, last_year = backend.year_bounds()
+    clean_panel = clean_panel_for(backend, version)
+    forecastable = clean_panel.forecastable()
+    forecast_store = load_forecast_store()
+
+    # Written next to the final directory and swapped in, so the dashboard never sees half an export
+    directory = snapshot_directory(version)
+    staging = directory + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    manifest = {"version": version, "rows": len(backend), "regions": all_regions,
+                "year_bounds": [first_year, last_year], "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "views": {}}
+    pages = []
+    try:
+        for spec in [{}, *views]:
+            regions = spec.get("regions") or all_regions
+            years = tuple(spec.get("years") or (first_year, last_year))
+            key = view_key(regions, years)
+            if key in manifest["views"]:
+                continue
+            started = time.perf_counter()
+            view = render_view(backend, regions, years)
+            if not view["rows"]:
+                print(f"Skipped {key}: no data")
+                continue
+            countries = (spec.get("countries")
+                         or [country for country in view["countries"] if country in forecastable][:1])
+            history = clean_panel.history(countries, regions, years)
+            # A country too short to fit, or whose fit fails, is exported without its forecast; one fit per country,
+            # as in the API, so the others keep theirs
+            short = too_short_to_forecast(history, history.columns, last_year)
+            forecasts = {}
+            for country in history.columns:
+                if country in short:
+                    print(f"Skipped forecast for {country} in {key}: {short[country]}", flush=True)
+                    continue
+                try:
+                    forecasts.update(country_forecasts(history, [country], last_year, FORECAST_STEPS,
+                                                       forecast_store=forecast_store))
+                except Exception as e:
+                    print(f"Skipped forecast for {country} in {key}: {type(e).__name__}: {e}", flush=True)
+
+            entry = {"directory": _view_directory(key), "rows": view["rows"], "countries": view["countries"]}
+            _write_view(os.path.join(staging, entry["directory"]), view)
+            manifest["views"][key] = entry
+            if html_dir:
+                title = f"{', '.join(sorted(map(str, regions)))} {years[0]}-{years[1]}"
+                figures = list(view["figures"].values())
+                forecasts, _ = complete_forecasts(forecasts)
+                if forecasts:
+                    adjusted = {country: apply_growth(values, 0.0, 0.0) for country, values in forecasts.items()}
+                    future_years = {country: forecast_years(history, country, last_year, FORECAST_STEPS)
+                                    for country in forecasts}
+                    figures.append(forecast_figure(history, adjusted, future_years, last_year,
+                                                   title=f"Energy Consumption Forecast for {', '.join(forecasts)}"))
+                pages.append((f"{entry['directory']}.html", title))
+                os.makedirs(html_dir, exist_ok=True)
+                with open(os.path.join(html_dir, pages[-1][0]), "w", encoding="utf-8") as handle:
+                    handle.write(_html_page(title, figures))
+            print(f"Exported {key} ({view['rows']} rows, forecasts for {', '.join(forecasts) or 'none'}, "
+                  f"{time.perf_counter() - started:.1f}s)", flush=True)
+
+        with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle, indent=2)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    # Snapshots of older dataset versions can no longer be served
+    for name in os.listdir(SNAPSHOT_DIR):
+        if name != str(version):
+            shutil.rmtree(os.path.join(SNAPSHOT_DIR, name), ignore_errors=True)
+    if html_dir:
+        links = "".join(f"<li><a href=\"{name}\">{html.escape(title)}</a></li>" for name, title in pages)
+        with open(os.path.join(html_dir, "index.html"), "w", encoding="utf-8") as handle:
+            handle.write(f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Energy Dashboard</title></head>"
+                         f"<body><h1>Energy Dashboard</h1><ul>{links}</ul></body></html>")
+    print(f"Wrote {len(manifest['views'])} views to {directory}")
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-render the dashboard's default view and common selections.")
+    parser.add_argument("source", help="Path to the source Excel workbook")
+    parser.add_argument("--config", help="JSON list of extra views: {\"regions\": [...], \"years\": [start, end], "
+                                         "\"countries\": [...]}, each field optional")
+    parser.add_argument("--html", help="Also write each view as a standalone HTML page to this directory")
+    args = parser.parse_args(argv)
+    views = []
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as handle:
+            views = json.load(handle)
+    export_snapshots(args.source, views, args.html)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,21 @@
 #Energy Dashboard
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import os
 import numpy as np
-from statsmodels.tsa.arima.model import ARIMA
-from sklearn.metrics import mean_squared_error, mean_absolute_error
+from energy_core.app_cache import shared_cache, track_run_lookups
+from energy_core.backtest import backtest_summary, load_backtest_summary
+from energy_core.batch_forecast import load_forecast_store, stored_metrics
+from energy_core.figures import (bubble_figure, fan_figure, forecast_figure, sources_figure, top_countries_figure,
+                                 trend_figure)
+from energy_core.forecast_jobs import forecast_jobs
+from energy_core.instrumentation import RunTimer
+from energy_core.gaps import clean_panel_for
+from energy_core.pipeline import (FORECAST_STEPS, MAX_FORECAST_COUNTRIES, apply_growth, complete_forecasts,
+                                  country_forecasts, dataset_source, filter_selection, forecast_years, load_backend,
+                                  request_forecasts, too_short_to_forecast)
+from energy_core.scenarios import PERCENTILES, fan_bands, grid_paths, monte_carlo_paths
+from energy_core.snapshots import SnapshotBackend, open_snapshot
  
 # ------------------ Custom Styling -------------------
  
@@ -27,19 +37,45 @@ st.sidebar.markdown(
 )
  
 # ------------------ Load Dataset ------------------
-file_path = r"C:\Users\puvanavks\OneDrive\Desktop\Energy-Dashboard-main\Processed_Merged_Energy_Data.xlsx"
+# All sessions share one base frame; copy-on-write keeps derived frames from copying it or writing into it
+pd.set_option("mode.copy_on_write", True)
 
-# Check if the file exists
-if not os.path.exists(file_path):
+# Timing spans for this run; shown with ?profile=1 and exported to the timing log and metrics file
+timer = RunTimer(cache_counts=track_run_lookups())
+ 
+ 
+@st.cache_resource(max_entries=1, show_spinner="Loading dataset...")
+def load_shared_dataset(path, version, from_store):
+    # One query backend per dataset version, shared by every session: the in-memory dataset with its rollup cube
+    # and index (pandas), or DuckDB over the Parquet files (ENERGY_BACKEND=duckdb). When snapshots were exported
+    # for this version, the exported views are served from them and the backend is only loaded for other selections
+    return open_snapshot(version, lambda: load_backend(path, version, from_store))
+ 
+ 
+file_path = os.environ.get(
+    "ENERGY_DATA_PATH",
+    r"C:\Users\puvanavks\OneDrive\Desktop\Energy-Dashboard-main\Processed_Merged_Energy_Data.xlsx"
+)
+
+# Prefer the ingested dataset store when one exists, otherwise check that the file exists
+try:
+    use_store, version = dataset_source(file_path)
+except FileNotFoundError:
     st.error("File not found at the given path")
     st.stop()  # Stop execution immediately
 
-# Try loading the dataset
+# Try loading the dataset (served from the Parquet cache after the first load)
+load_span = timer.start("dataset_load")
 try:
-    df = pd.read_excel(file_path)
+    # Filtering and aggregation below go through the backend rather than a loaded DataFrame
+    backend = load_shared_dataset(file_path, version, use_store)
 except Exception as e:
     st.error(f"Failed to load dataset: {e}")
     st.stop()  # Stop execution immediately
+load_span.stop(rows=len(backend))
+ 
+# Years covered by the data; the year slider follows them
+first_year, last_year = backend.year_bounds()
 
 
 # ------------------ Sidebar Filters ------------------
@@ -65,17 +101,16 @@ st.sidebar.markdown(
     """, unsafe_allow_html=True
 )
  
-# Ensure the 'Region' column exists in the DataFrame
-if 'Region' in df.columns:
-    # Get all unique regions in the dataset
-    all_regions = sorted(df['Region'].unique())  # Remove duplicates and sort
+# Ensure the dataset has regions
+all_regions = backend.regions()  # Unique regions, sorted
+if all_regions:
  
     # Create checkboxes for each region
     for region in all_regions:
         if st.sidebar.checkbox(region, value=True, key=f"region_checkbox_{region}"):
             selected_regions.append(region)
 else:
-    st.sidebar.warning("The 'Region' column does not exist in the dataset.")
+    st.sidebar.warning("The dataset does not contain any regions.")
  
 # Custom styled header for "Select Year Range"
 st.sidebar.markdown(
@@ -89,30 +124,31 @@ st.sidebar.markdown(
 # ------------------ Year Range Slider ------------------
 year_range = st.sidebar.slider(
     "",
-    min_value=2000,  # Set min value to 2000
-    max_value=2023,  # Set max value to 2023
-    value=(2000, 2023)  # Adjust default value to start from 2000
+    min_value=first_year,  # First year in the dataset
+    max_value=last_year,  # Last year in the dataset
+    value=(first_year, last_year)  # Default to the full range
 )
  
 # ------------------ Data Filtering ------------------
 # Ensure that the DataFrame is not empty before filtering
-if 'df' in locals() and not df.empty:
-    filtered_data = df[df["Region"].isin(selected_regions)]
- 
-    # Apply year filters
-    final_data = filtered_data[
-        (filtered_data["Year"] >= year_range[0]) &
-        (filtered_data["Year"] <= year_range[1])
-    ].copy()
+filter_span = timer.start("filtering")
+if len(backend):
+    # Rows matching the selected regions and year range, counted by the backend instead of full-frame masks
+    final_count, filter_key = filter_selection(backend, version, selected_regions, year_range)
+    if isinstance(backend, SnapshotBackend):
+        # Pre-rendered charts of an exported view go straight into the shared cache
+        backend.prime(selected_regions, year_range, filter_key, shared_cache)
  
     # Display a warning if no data matches the filters
-    if final_data.empty:
+    if not final_count:
         st.sidebar.warning("No data available for the selected filters. Please adjust your selections.")
+ 
+    filter_span.stop(rows=final_count)
 else:
     st.sidebar.error("The dataset is empty or not loaded properly.")
  
 st.markdown(
-    """
+    f"""
     <h1 style="text-align: center;
             padding: 20px;
             background-color: #4CAF50;
@@ -121,7 +157,7 @@ st.markdown(
             border: 5px solid #D3D3D3;"> <!-- Light grey border -->
         Energy Consumption Dashboard
     </h1>
-    <h3 style="text-align: center; color: grey; font-size: 36px; font-weight: bold;">2000-2023</h3> <!-- Bigger font size for 2000-2023 -->
+    <h3 style="text-align: center; color: grey; font-size: 36px; font-weight: bold;">{first_year}-{last_year}</h3> <!-- Bigger font size for the year span -->
     <p style="text-align: center; color: grey; font-size: 16px; padding: 15px; width: 90%; margin: auto; font-weight: bold;">
         This dashboard provides essential insights into primary <span style="color: #DAA520;">energy consumption</span> patterns and their connection to regional economic factors, population, and energy sources.
         Analyzing historical trends, such as global primary <span style="color: #DAA520;">energy consumption</span> by region and the proportion of <span style="color: #DAA520;">energy sources</span>, helps identify areas of high demand and the shift towards <span style="color: #DAA520;">renewable energy</span>.
@@ -158,31 +194,23 @@ st.markdown(
     """, unsafe_allow_html=True
 )
 
-if not final_data.empty:
+overview_span = timer.start("overview")
+if final_count:
     # Create columns for side-by-side charts with dividers
     col1, col_divider1, col2, col_divider2, col3 = st.columns([4, 0.1, 4, 0.1, 4])
 
     # Global Trends per Region
     with col1:
-        trend_data = final_data.groupby(["Year", "Region"]).agg({
-            "primary_energy_consumption": "sum",
-            "gdp": "mean",
-            "population": "mean"
-        }).reset_index()
+        fig_trends = shared_cache.get("figures", ("trends", filter_key))
+        if fig_trends is None:
+            # Sum of energy and mean GDP/population per year and region, from the rollup cube or the SQL backend
+            trend_data = shared_cache.get_or_compute(
+                "aggregates", ("trends", filter_key), lambda: backend.trend(selected_regions, year_range)
+            )
 
-        fig_trends = px.line(
-            trend_data,
-            x="Year",
-            y="primary_energy_consumption",
-            color="Region",  # Color the lines by Region
-            title="Global Energy Consumption Trends by Region",
-            labels={"primary_energy_consumption": "Energy Consumption (TWh)", "Year": "Year"},
-            markers=True
-        )
-        fig_trends.update_layout(
-            height=400,  # Fixed height for consistency
-            margin={"t": 40, "b": 80, "l": 50, "r": 50}  # Ensure consistent margins
-        )
+            # Lines colored by region, downsampled and drawn with WebGL once the series get long
+            fig_trends = trend_figure(trend_data)
+            shared_cache.put("figures", ("trends", filter_key), fig_trends)
         st.plotly_chart(fig_trends, use_container_width=True)
 
     # Vertical light grey divider between Global Trends and Energy Source Contribution
@@ -196,22 +224,16 @@ if not final_data.empty:
 
     # Energy Source Contribution per Region
     with col2:
-        energy_sources = final_data.groupby("Region")[["oilcons_ej", "coalcons_ej", "gascons_ej", "ren_power_ej"]].sum().reset_index()
-
-        # Calculate the sum of each energy source column across regions
-        energy_sources_sum = energy_sources[["oilcons_ej", "coalcons_ej", "gascons_ej", "ren_power_ej"]].sum()
+        energy_pie = shared_cache.get("figures", ("sources", filter_key))
+        if energy_pie is None:
+            # Calculate the sum of each energy source column across the selected regions
+            energy_sources_sum = shared_cache.get_or_compute(
+                "aggregates", ("sources", filter_key), lambda: backend.source_totals(selected_regions, year_range)
+            )
 
-        # Create a pie chart using the total sums for each energy source
-        energy_pie = px.pie(
-            names=energy_sources_sum.index,  # Names are the energy sources (columns)
-            values=energy_sources_sum.values,  # Values are the summed consumption for each source
-            title="Proportion of Energy Sources by Region",
-            hole=0.4
-        )
-        energy_pie.update_layout(
-            height=400,  # Fixed height for consistency
-            margin={"t": 40, "b": 80, "l": 50, "r": 50}  # Ensure consistent margins
-        )
+            # Create a pie chart using the total sums for each energy source
+            energy_pie = sources_figure(energy_sources_sum)
+            shared_cache.put("figures", ("sources", filter_key), energy_pie)
         st.plotly_chart(energy_pie, use_container_width=True)
 
     # Vertical light grey divider between Energy Source Contribution and Top Countries
@@ -225,33 +247,22 @@ if not final_data.empty:
 
     # Top Energy Consuming Countries by Region
     with col3:
-        top_countries = final_data.groupby(["Region", "Country"])["primary_energy_consumption"].sum().reset_index()
-        top_countries_region = top_countries[top_countries["Region"].isin(selected_regions)]
-
-        # Sort the data before applying nlargest to ensure proper alignment
-        top_countries_region_sorted = top_countries_region.sort_values("primary_energy_consumption", ascending=False)
-        top_countries_region_sorted = top_countries_region_sorted.groupby("Region").head(3).reset_index(drop=True)
+        fig_top_countries = shared_cache.get("figures", ("top_countries", filter_key))
+        if fig_top_countries is None:
+            # Top 3 countries per region by total consumption over the selected years
+            top_countries_region_sorted = shared_cache.get_or_compute(
+                "aggregates", ("top_countries", filter_key),
+                lambda: backend.top_countries(selected_regions, year_range, n=3)
+            )
 
-        fig_top_countries = px.bar(
-            top_countries_region_sorted,
-            x="primary_energy_consumption",
-            y="Country",
-            color="Region",
-            orientation="h",
-            title="Top 3 Energy Consuming Countries by Region",
-            labels={"primary_energy_consumption": "Energy Consumption (TWh)", "Country": "Country"}
-        )
-        
-        fig_top_countries.update_layout(
-            height=400,  # Fixed height for consistency
-            margin={"t": 40, "b": 80, "l": 50, "r": 50},  # Ensure consistent margins
-            yaxis=dict(tickmode='linear', tickangle=0),  # Ensure y-axis labels are not skipped
-        )
+            fig_top_countries = top_countries_figure(top_countries_region_sorted)
+            shared_cache.put("figures", ("top_countries", filter_key), fig_top_countries)
 
         st.plotly_chart(fig_top_countries, use_container_width=True)
 
 else:
     st.write("No data to display for the selected filters.")
+overview_span.stop(rows=final_count)
 
 # Divider between sections
 st.markdown("---")
@@ -282,39 +293,24 @@ st.markdown(
 )
 
  
+economic_span = timer.start("economic_impact")
+
 # Extract the final year from the selected year range
 final_year = year_range[1]  # Get the maximum (final) year from the slider
  
-if not final_data.empty:
-    # Filter data based on the final year and regions
-    selected_regions = final_data["Region"].unique()  # Get unique regions
-    filtered_data = final_data[
-        (final_data["Year"] == final_year) & (final_data["Region"].isin(selected_regions))
-    ]
- 
-    if not filtered_data.empty:
-        # Group the data by region and aggregate the relevant columns
-        grouped_data = filtered_data.groupby("Region").agg(
-            total_gdp=('gdp', 'sum'),
-            total_population=('population', 'sum'),
-            total_energy_consumption=('primary_energy_consumption', 'sum'),
-            number_of_countries=('Country', 'nunique')  # Count unique countries in each region
-        ).reset_index()
+# Totals per region for the final year, with the number of countries in each region
+grouped_data = shared_cache.get_or_compute(
+    "aggregates", ("region_totals", filter_key), lambda: backend.region_totals(selected_regions, final_year)
+)
  
 # Create columns for side-by-side charts
 col1, col_divider, col2 = st.columns([4, 0.1, 4])  # Adjust column width proportions as needed
  
 # Energy Consumption vs. GDP (1 bubble for each region)
 with col1:
-    fig1 = px.scatter(
-        grouped_data,
-        x="total_gdp",
-        y="total_energy_consumption",
-        color="Region",  # Color by Region
-        size="number_of_countries",  # Bubble size by number of countries
-        title=f"Energy Consumption vs. GDP by Region (Year {final_year})",
-        size_max=50  # Adjust size scale for better visualization
-    )
+    fig1 = shared_cache.get_or_compute("figures", ("gdp_bubbles", filter_key), lambda: bubble_figure(
+        grouped_data, "total_gdp", "GDP", final_year
+    ))
     st.plotly_chart(fig1)
  
 # Vertical grey divider with fixed height
@@ -328,16 +324,11 @@ with col_divider:
  
 # Energy Consumption vs. Population (1 bubble for each region)
 with col2:
-    fig2 = px.scatter(
-        grouped_data,
-        x="total_population",
-        y="total_energy_consumption",
-        color="Region",  # Color by Region
-        size="number_of_countries",  # Bubble size by number of countries
-        title=f"Energy Consumption vs. Population by Region (Year {final_year})",
-        size_max=50  # Adjust size scale for better visualization
-    )
+    fig2 = shared_cache.get_or_compute("figures", ("population_bubbles", filter_key), lambda: bubble_figure(
+        grouped_data, "total_population", "Population", final_year
+    ))
     st.plotly_chart(fig2)
+economic_span.stop(rows=len(grouped_data))
  
 # Add note below the charts
 st.markdown(
@@ -378,23 +369,34 @@ st.markdown(
     """, unsafe_allow_html=True
 )
  
+forecast_span = timer.start("forecast")
+
 # Create two columns: one for the filters and one for the chart
 col1, col2 = st.columns([1, 2])  # Define layout with desired width ratio
  
-# Exclude specific countries from the dropdown options
-excluded_countries = ["Chad", "Curacao", "Guyana",
-                      "Mozambique", "Papua New Guinea",
-                      "Serbia", "South Sudan"]
- 
-available_countries = final_data[~final_data["Country"].isin(excluded_countries)]["Country"].unique()
+# Cleaned panel (gaps found and interpolated once per dataset version); countries with missing years are offered
+# as long as enough years remain to fit a forecast on
+clean_panel = clean_panel_for(backend, version)
+forecastable_countries = clean_panel.forecastable()
+available_countries = [country for country in backend.countries(selected_regions, year_range)
+                       if country in forecastable_countries]
  
 with col1:
+    # Forecast engine: the panel AR model fits all selected countries in one batch, so many more can be compared
+    forecast_engine = st.radio(
+        "Forecast Model:",
+        options=["ARIMA", "Panel AR (fast, many countries)"],
+        horizontal=True
+    )
+    panel_engine = forecast_engine != "ARIMA"
+    max_countries = MAX_FORECAST_COUNTRIES["panel" if panel_engine else "arima"]
+ 
     # Dropdown to select countries for prediction (allow selecting multiple countries)
     selected_countries_predict = st.multiselect(
-        "Select Countries for Prediction (Up to 2):",
+        f"Select Countries for Prediction (Up to {max_countries}):",
         options=available_countries,  # Use the filtered country list
         default=[available_countries[0]],  # Dynamically set the default to the first country in the list
-        max_selections=2  # Limit to two countries
+        max_selections=max_countries  # Two for ARIMA (one fit per country), 24 for the batched panel model
     )
  
     # Input fields for projected growth rates
@@ -432,79 +434,120 @@ with col2:
                     margin-top: -10px;">
             <strong>Analyse by:</strong><br>
             - <strong>Simulating Economic Scenarios:</strong> Adjust GDP and population growth rates to model future energy consumption trends and explore localized scenarios for more accurate forecasts.<br>
-            - <strong>Comparing Countries:</strong> Select and overlay the energy consumption trends of two countries to directly compare their patterns and identify regional differences.
+            - <strong>Comparing Countries:</strong> Select and overlay the energy consumption trends of two countries (or more with the panel model) to directly compare their patterns and identify regional differences.
         </div>
         """, unsafe_allow_html=True
     )
     
-    # Filter data for the selected countries
-    countries_data = final_data[final_data["Country"].isin(selected_countries_predict)]
- 
-    if not countries_data.empty:
-        # Prepare time series data for ARIMA
-        ts_data = countries_data.groupby(["Year", "Country"])["primary_energy_consumption"].sum().unstack(fill_value=0)
- 
-        # Prepare the forecast for each selected country
-        forecast_combined = []
- 
-        for country in selected_countries_predict:
-            # Fit the ARIMA model with data up to 2023
-            model = ARIMA(ts_data[country].loc[ts_data.index <= 2023], order=(2, 1, 2))  # Example ARIMA parameters (p=2, d=1, q=2)
-            model_fit = model.fit()
- 
-            # Forecast for the prediction period (2024-2028)
-            future_years = np.arange(2024, 2029)
-            future_forecast = model_fit.forecast(steps=len(future_years))
+    # Years x countries history of the selected countries from the cleaned panel
+    ts_data = clean_panel.history(selected_countries_predict, selected_regions, year_range)
+ 
+    if not ts_data.empty:
+        # Forecast the years after each selected country's last reported year (fitted on data up to it)
+        forecast_store = load_forecast_store()  # Written by energy_core.batch_forecast, if it has been run
+        # Countries with too few years in the selected range are reported rather than fitted on a handful of points
+        short_countries = too_short_to_forecast(ts_data, ts_data.columns, last_year)
+        forecast_countries = [country for country in ts_data.columns if country not in short_countries]
+        future_years = {country: forecast_years(ts_data, country, last_year, FORECAST_STEPS)
+                        for country in forecast_countries}
+ 
+        def current_forecasts():
+            # (forecasts ready now, {country: job_id} still running, {country: error} for failed fits)
+            if panel_engine:
+                # The panel model fits all countries in one quick batch, so it runs inline
+                forecasts = country_forecasts(ts_data, forecast_countries, last_year, FORECAST_STEPS,
+                                              panel_engine=True) if forecast_countries else {}
+                return forecasts, {}, {}
+            # ARIMA fits run on the shared background pool; other sessions asking for the same fit join that job
+            forecasts, pending = request_forecasts(ts_data, forecast_countries, last_year,
+                                                   FORECAST_STEPS, forecast_jobs, forecast_store=forecast_store)
+            errors = {country: forecast_jobs.error(job_id) for country, job_id in pending.items()}
+            failed = {country: message for country, message in errors.items() if message}
+            running = {country: job_id for country, job_id in pending.items() if country not in failed}
+            return forecasts, running, failed
+ 
+        running_jobs = {} if panel_engine else current_forecasts()[1]
+ 
+        # The history is drawn straight away; while fits are running the chart polls and adds each forecast as it lands
+        @st.fragment(run_every=1.0 if running_jobs else None)
+        def forecast_chart():
+            forecasts, running, failed = current_forecasts()
+            forecasts, incomplete = complete_forecasts(forecasts)
  
             # Adjust for GDP and population growth
-            adjusted_forecast = (
-                future_forecast * (1 + (gdp_growth / 100)) * (1 + (population_growth / 100))
+            adjusted_forecasts = {country: apply_growth(forecasts[country], gdp_growth, population_growth)
+                                  for country in selected_countries_predict if country in forecasts}
+ 
+            # History with each forecast appended in orange (history only until a forecast is ready)
+            historical_data_combined = ts_data.loc[ts_data.index <= last_year]
+            fig_forecast = forecast_figure(
+                ts_data, adjusted_forecasts, future_years, last_year,
+                title=f"Energy Consumption Forecast for {', '.join(selected_countries_predict)}"
             )
  
-            # Prepare future forecast DataFrame
-            future_forecast_df = pd.DataFrame({
-                "Year": future_years,
-                f"Predicted Energy Consumption (TWh) - {country}": adjusted_forecast
-            })
- 
-            forecast_combined.append(future_forecast_df.set_index("Year")[f"Predicted Energy Consumption (TWh) - {country}"])
- 
-        # Combine historical and forecast data for plotting
-        historical_data_combined = ts_data.loc[ts_data.index <= 2023]
-        forecast_combined_df = pd.concat(forecast_combined, axis=1)
- 
-        # Create a DataFrame for combined data for plotting
-        combined_data = pd.concat([historical_data_combined, forecast_combined_df], axis=1).reset_index()
- 
-        # Generate the forecast plot
-        fig_forecast = px.line(
-            combined_data,
-            x="Year",
-            y=combined_data.columns[1:],  # All forecast columns
-            title=f"Energy Consumption Forecast for {', '.join(selected_countries_predict)}",
-            labels={"Year": "Year", "Energy Consumption (TWh)": "Energy Consumption (TWh)"},
-            markers=True
-        )
- 
-        # Highlight predicted values with a different color
-        for trace in fig_forecast.data:
-            if 'Predicted' in trace.name:
-                trace.line.color = 'orange'  # Set color for predicted data
- 
-        # Add a vertical dotted line at 2023
-        fig_forecast.add_vline(
-            x=2023,
-            line_dash="dot",
-            line_color="red",
-            annotation_text="Forecast Start",
-            annotation_position="top"
-        )
- 
-        # Display the plot
-        st.plotly_chart(fig_forecast, use_container_width=True)
+            # Display the plot
+            st.plotly_chart(fig_forecast, use_container_width=True)
+
+            if running:
+                st.info(f"Computing forecast for {', '.join(running)}...")
+            elif running_jobs:
+                st.rerun()  # Every job has finished; rerun the page once to stop polling
+            for country, message in failed.items():
+                st.warning(f"Forecast failed for {country}: {message}")
+            for country, reason in short_countries.items():
+                st.warning(f"No forecast for {country}: {reason}.")
+            for country in incomplete:
+                st.warning(f"No forecast for {country}: the model returned no values after its last reported year "
+                           f"({future_years[country][0] - 1}).")
+ 
+            # Many year-by-year GDP/population growth paths around the slider values, applied to the base forecasts
+            ready = [country for country in selected_countries_predict if country in forecasts]
+            if ready:
+                with st.expander("Scenario Fan Chart (simulated growth paths)"):
+                    scenario_col1, scenario_col2 = st.columns(2)
+                    with scenario_col1:
+                        sampling = st.radio("Growth Paths:", ["Monte Carlo", "Grid"], horizontal=True)
+                        n_paths = st.slider("Number of Paths", min_value=1000, max_value=20000, value=10000, step=1000)
+                    with scenario_col2:
+                        gdp_volatility = st.slider("GDP Growth Volatility (percentage points)",
+                                                   min_value=0.0, max_value=5.0, value=1.0, step=0.1)
+                        population_volatility = st.slider("Population Growth Volatility (percentage points)",
+                                                          min_value=0.0, max_value=2.0, value=0.3, step=0.1)
+ 
+                    make_paths = monte_carlo_paths if sampling == "Monte Carlo" else grid_paths
+                    gdp_rates, population_rates = make_paths(gdp_growth, population_growth, gdp_volatility,
+                                                             population_volatility, n_paths, FORECAST_STEPS)
+                    bands = fan_bands(np.vstack([forecasts[country] for country in ready]), gdp_rates, population_rates)
+                    fig_fan = fan_figure(historical_data_combined[ready], future_years, bands, ready, PERCENTILES,
+                                         title=f"Scenario Range for {', '.join(ready)}")
+                    st.plotly_chart(fig_fan, use_container_width=True)
+                    st.caption("Shaded bands cover the 5-95% and 25-75% ranges of the simulated paths and the dashed "
+                               "line is the median. Growth rates vary by year and compound over the forecast horizon.")
+ 
+        forecast_chart()
+ 
+        # Years without a reported value that were filled by interpolation
+        imputed_years = clean_panel.imputed_years(ts_data.columns, year_range)
+        if imputed_years:
+            st.caption("Interpolated (not reported) years: " + "; ".join(
+                f"{country} {', '.join(map(str, years))}" for country, years in imputed_years.items()
+            ))
+ 
+        # Hold-out error of each model from the batch run
+        metrics = stored_metrics(forecast_store, selected_countries_predict)
+        if metrics is not None and not metrics.empty:
+            with st.expander("Model Error Metrics (hold-out MSE / MAE)"):
+                st.dataframe(metrics, hide_index=True, use_container_width=True)
+
+        # Rolling-origin errors pooled over horizons 1-5, from backtest.py
+        backtest = backtest_summary(load_backtest_summary(), selected_countries_predict)
+        if backtest is not None and not backtest.empty:
+            with st.expander("Backtest Metrics (rolling origin) and Best Model"):
+                st.dataframe(backtest, hide_index=True, use_container_width=True)
  
     else:
         st.warning(f"No data available for {', '.join(selected_countries_predict)}.")
+forecast_span.stop(rows=int(ts_data.count().sum()))
  
  
 # Divider between sections
@@ -526,3 +569,22 @@ st.markdown(
 # Divider between sections
 st.markdown("---")
  
+ 
+# ------------------ Profiling (hidden, open with ?profile=1) -------------------
+timer.finish()
+if st.query_params.get("profile") == "1":
+    with st.expander("Timing for this run"):
+        st.dataframe(timer.table(), hide_index=True, use_container_width=True)
+ 
+ 
+# ------------------ Admin: Cache Statistics (hidden, open with ?admin=1) -------------------
+if st.query_params.get("admin") == "1":
+    with st.sidebar.expander("Cache Statistics", expanded=True):
+        st.caption(
+            f"Shared cache: {shared_cache.total_bytes / 1024 ** 2:.1f} of "
+            f"{shared_cache.max_bytes / 1024 ** 2:.0f} MB, TTL {shared_cache.ttl_seconds / 3600:.1f} h"
+        )
+        st.dataframe(shared_cache.stats(), hide_index=True, use_container_width=True)
+        if st.button("Clear shared cache"):
+            shared_cache.clear()
+            st.rerun()
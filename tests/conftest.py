@@ -0,0 +1,40 @@
+#Fixtures: a small synthetic dataset with missing values, uneven years per country and a repeated country-year
+import atexit
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Caches written by the code under test go to a scratch directory, never the real .energy_cache; set before any
+# energy_core module reads it
+os.environ["ENERGY_CACHE_DIR"] = tempfile.mkdtemp(prefix="energy-tests-")
+atexit.register(shutil.rmtree, os.environ["ENERGY_CACHE_DIR"], True)
+
+from energy_core.schema import compact  # noqa: E402
+
+REGIONS = ["Africa", "Europe", "North America"]
+
+
+@pytest.fixture(scope="session")
+def dataset():
+    rng = np.random.default_rng(7)
+    records = []
+    for number in range(12):
+        country, region = f"Country{number:02d}", REGIONS[number % len(REGIONS)]
+        # Every fourth country starts reporting late
+        for year in range(2000 + (number % 4 == 3) * 4, 2011):
+            records.append({
+                "Country": country, "Year": year, "Region": region,
+                "primary_energy_consumption": rng.uniform(10, 1000), "gdp": rng.uniform(1e9, 1e12),
+                "population": float(rng.integers(1e5, 1e8)), "oilcons_ej": rng.uniform(0, 5),
+                "coalcons_ej": rng.uniform(0, 5), "gascons_ej": rng.uniform(0, 5), "ren_power_ej": rng.uniform(0, 5),
+            })
+    df = pd.DataFrame(records)
+    df.loc[df.sample(frac=0.1, random_state=1).index, ["primary_energy_consumption", "gdp", "oilcons_ej"]] = np.nan
+    # The same country and year reported twice
+    df = pd.concat([df, df[(df["Country"] == "Country01") & (df["Year"] == 2005)]], ignore_index=True)
+    compacted, _ = compact(df)
+    return compacted
@@ -0,0 +1,113 @@
+#The Overview and Economic Impact aggregates of every backend must match the plain groupby the dashboard used to run
+import os
+
+import pandas as pd
+import pytest
+
+from energy_core.backends import DuckDBBackend, PandasBackend
+from energy_core.query_index import FrameIndex
+from energy_core.rollup_cube import ENERGY_SOURCES, RollupCube
+
+SELECTIONS = [
+    (["Africa", "Europe", "North America"], (2000, 2010)),
+    (["Europe"], (2003, 2007)),
+    (["Africa", "North America"], (2010, 2010)),
+    (["Europe"], (1990, 1995)),
+]
+
+
+def _filtered(df, regions, year_range):
+    return df[df["Region"].isin(regions) & df["Year"].between(*year_range)]
+
+
+def expected_countries(df, regions, year_range):
+    # In the order countries first appear in the whole dataset, like the dashboard's dropdown
+    present = set(_filtered(df, regions, year_range)["Country"])
+    return [country for country in df["Country"].unique() if country in present]
+
+
+def expected_trend(df, regions, year_range):
+    trend = _filtered(df, regions, year_range).groupby(["Year", "Region"], observed=True).agg(
+        {"primary_energy_consumption": "sum", "gdp": "mean", "population": "mean"}
+    )
+    return trend.reset_index()
+
+
+def expected_source_totals(df, regions, year_range):
+    return _filtered(df, regions, year_range)[ENERGY_SOURCES].sum()
+
+
+def expected_top_countries(df, regions, year_range, n=3):
+    totals = _filtered(df, regions, year_range).groupby(["Region", "Country"], observed=True)[
+        "primary_energy_consumption"].sum().reset_index()
+    ranked = totals.sort_values("primary_energy_consumption", ascending=False)
+    return ranked.groupby("Region", observed=True).head(n).reset_index(drop=True)
+
+
+def expected_region_totals(df, regions, year):
+    return _filtered(df, regions, (year, year)).groupby("Region", observed=True).agg(
+        total_gdp=("gdp", "sum"),
+        total_population=("population", "sum"),
+        total_energy_consumption=("primary_energy_consumption", "sum"),
+        number_of_countries=("Country", "nunique"),
+    ).reset_index()
+
+
+def _normalized(frame, keys):
+    # Labels as strings and a fixed row order, so categorical and string results compare equal
+    frame = frame.astype({key: str for key in keys if key != "Year"})
+    return frame.sort_values(keys).reset_index(drop=True)
+
+
+@pytest.fixture(scope="module", params=["pandas", "duckdb"])
+def engine(request, dataset, tmp_path_factory):
+    if request.param == "pandas":
+        return PandasBackend(dataset, RollupCube.from_frame(dataset), FrameIndex(dataset))
+    pytest.importorskip("duckdb")
+    path = os.path.join(tmp_path_factory.mktemp("duckdb"), "dataset.parquet")
+    dataset.to_parquet(path, index=False)
+    return DuckDBBackend([path])
+
+
+@pytest.mark.parametrize("regions, year_range", SELECTIONS)
+def test_count(engine, dataset, regions, year_range):
+    assert engine.count(regions, year_range) == len(_filtered(dataset, regions, year_range))
+
+
+@pytest.mark.parametrize("regions, year_range", SELECTIONS)
+def test_countries(engine, dataset, regions, year_range):
+    assert list(map(str, engine.countries(regions, year_range))) == expected_countries(dataset, regions, year_range)
+
+
+@pytest.mark.parametrize("regions, year_range", SELECTIONS)
+def test_trend(engine, dataset, regions, year_range):
+    pd.testing.assert_frame_equal(
+        _normalized(engine.trend(regions, year_range), ["Year", "Region"]),
+        _normalized(expected_trend(dataset, regions, year_range), ["Year", "Region"]),
+        check_dtype=False,
+    )
+
+
+@pytest.mark.parametrize("regions, year_range", SELECTIONS)
+def test_source_totals(engine, dataset, regions, year_range):
+    pd.testing.assert_series_equal(engine.source_totals(regions, year_range),
+                                   expected_source_totals(dataset, regions, year_range), check_dtype=False,
+                                   check_names=False)
+
+
+@pytest.mark.parametrize("regions, year_range", SELECTIONS)
+def test_top_countries(engine, dataset, regions, year_range):
+    pd.testing.assert_frame_equal(
+        _normalized(engine.top_countries(regions, year_range, n=3), ["Region", "Country"]),
+        _normalized(expected_top_countries(dataset, regions, year_range), ["Region", "Country"]),
+        check_dtype=False,
+    )
+
+
+@pytest.mark.parametrize("regions, year_range", SELECTIONS)
+def test_region_totals(engine, dataset, regions, year_range):
+    pd.testing.assert_frame_equal(
+        _normalized(engine.region_totals(regions, year_range[1]), ["Region"]),
+        _normalized(expected_region_totals(dataset, regions, year_range[1]), ["Region"]),
+        check_dtype=False,
+    )
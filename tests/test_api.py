@@ -0,0 +1,76 @@
+#The HTTP API answered in-process through its ASGI entry point, on a workbook with a country that stops reporting
+import asyncio
+import json
+
+import pytest
+
+from energy_core import api
+
+
+def _get(url):
+    path, _, query = url.partition("?")
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": query.encode("latin-1"), "headers": []}
+    response = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        else:
+            response["body"] = message["body"]
+
+    asyncio.run(api.app(scope, receive, send))
+    return response["status"], json.loads(response["body"])
+
+
+@pytest.fixture(scope="module", autouse=True)
+def workbook(dataset, tmp_path_factory):
+    # Country05 stops reporting after 2006
+    frame = dataset[(dataset["Country"] != "Country05") | (dataset["Year"] <= 2006)]
+    path = str(tmp_path_factory.mktemp("api") / "dataset.xlsx")
+    frame.astype({"Region": str, "Country": str}).to_excel(path, index=False)
+    patch = pytest.MonkeyPatch()
+    patch.setattr(api, "datasets", api.DatasetHandle(path))
+    yield path
+    patch.undo()
+
+
+def test_top_countries():
+    status, body = _get("/top-countries?regions=Europe&n=2")
+    assert status == 200
+    assert len(body) == 2
+
+
+@pytest.mark.parametrize("n", ["0", "-1", "x"])
+def test_invalid_n_is_rejected(n):
+    status, body = _get(f"/top-countries?n={n}")
+    assert status == 400
+    assert "n" in body["error"]
+
+
+def test_unknown_endpoint():
+    assert _get("/nothing")[0] == 404
+
+
+def test_too_many_countries():
+    status, body = _get("/forecasts?countries=Country00,Country01,Country02")
+    assert status == 400
+
+
+def test_short_range_is_reported_per_country():
+    status, body = _get("/forecasts?countries=Country00,Country01&model=panel&start=2008&end=2010")
+    assert status == 422
+    assert set(body["countries"]) == {"Country00", "Country01"}
+    assert "has 3" in body["countries"]["Country00"]
+
+
+def test_panel_forecast_labels_years_from_each_country():
+    status, body = _get("/forecasts?countries=Country04,Country05&model=panel")
+    assert status == 200
+    years = {}
+    for row in body:
+        years.setdefault(row["Country"], []).append(row["Year"])
+    assert years == {"Country04": [2011, 2012, 2013, 2014, 2015], "Country05": [2007, 2008, 2009, 2010, 2011]}
+    assert all(row["Forecast"] is not None for row in body)
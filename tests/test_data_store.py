@@ -0,0 +1,47 @@
+#Atomic writes and change-memoised reads of the cache files
+import os
+import threading
+
+from energy_core.data_store import read_if_changed, read_json, write_json
+
+
+def test_concurrent_writes_to_one_path(tmp_path):
+    path = str(tmp_path / "value.json")
+    errors = []
+
+    def write(number):
+        try:
+            for step in range(50):
+                write_json({"writer": number, "step": step}, path)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(number,)) for number in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert read_json(path)["step"] == 49
+    assert os.listdir(tmp_path) == ["value.json"]
+
+
+def test_failed_write_leaves_no_temporary_file(tmp_path):
+    path = str(tmp_path / "value.json")
+    write_json({"value": 1}, path)
+    try:
+        write_json({"value": object()}, path)
+    except TypeError:
+        pass
+    assert read_json(path) == {"value": 1}
+    assert os.listdir(tmp_path) == ["value.json"]
+
+
+def test_read_if_changed(tmp_path):
+    path = str(tmp_path / "value.json")
+    assert read_if_changed(path, read_json, missing={}) == {}
+    write_json({"value": 1}, path)
+    assert read_if_changed(path, read_json) == {"value": 1}
+    write_json({"value": 2}, path)
+    os.utime(path, ns=(1, 1))
+    assert read_if_changed(path, read_json) == {"value": 2}
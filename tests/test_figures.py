@@ -0,0 +1,28 @@
+#LTTB downsampling of line chart traces
+import numpy as np
+import pandas as pd
+
+from energy_core.figures import downsample_frame, lttb
+
+
+def test_lttb_keeps_short_series_whole():
+    assert lttb(np.arange(10), np.arange(10), 20).tolist() == list(range(10))
+
+
+def test_lttb_keeps_the_ends_and_the_peak():
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    y[437] = 10.0
+    selected = lttb(x, y, 50)
+    assert len(selected) == 50
+    assert selected[0] == 0 and selected[-1] == 999
+    assert (np.diff(selected) > 0).all()
+    assert 437 in selected
+
+
+def test_downsample_frame_bounds_each_trace():
+    frame = pd.DataFrame({"Year": np.tile(np.arange(500), 2), "Region": np.repeat(["A", "B"], 500),
+                          "value": np.arange(1000, dtype="float64")})
+    sampled = downsample_frame(frame, "Year", "value", color="Region", max_points=40)
+    assert sampled.groupby("Region").size().tolist() == [40, 40]
+    assert downsample_frame(frame.head(30), "Year", "value", max_points=40).equals(frame.head(30))
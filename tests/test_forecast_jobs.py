@@ -0,0 +1,59 @@
+#Background ARIMA jobs: results land in the forecast cache, failures are reported and retried once they expire
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from energy_core.app_cache import BudgetedCache
+from energy_core.forecast_cache import ForecastCache
+from energy_core.forecast_jobs import ForecastJobs
+
+ORDER = (1, 1, 0)
+BAD_ORDER = (-1, 1, 0)  # Rejected by statsmodels, so the fit fails
+SERIES = pd.Series(np.linspace(100, 150, 20), index=range(2000, 2020))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ForecastCache(memory=BudgetedCache(), directory=str(tmp_path))
+
+
+def _wait(jobs, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if jobs.result(job_id) is not None or jobs.error(job_id):
+            return
+        time.sleep(0.05)
+    raise AssertionError("job did not finish")
+
+
+def test_finished_job_is_in_the_cache(cache):
+    jobs = ForecastJobs(cache=cache, max_workers=1)
+    job_id = jobs.submit("A", SERIES, cutoff=2019, order=ORDER, steps=5)
+    assert jobs.submit("A", SERIES, cutoff=2019, order=ORDER, steps=5) == job_id
+    _wait(jobs, job_id)
+    assert len(jobs.result(job_id)) == 5
+    assert jobs.error(job_id) is None
+
+
+def test_failed_job_is_reported_then_retried(cache):
+    jobs = ForecastJobs(cache=cache, max_workers=1, retry_seconds=1)
+    job_id = jobs.submit("A", SERIES, cutoff=2019, order=BAD_ORDER, steps=5)
+    _wait(jobs, job_id)
+    assert jobs.error(job_id)
+    time.sleep(1.1)
+    assert jobs.error(job_id) is None
+    jobs.submit("A", SERIES, cutoff=2019, order=BAD_ORDER, steps=5)
+    _wait(jobs, job_id)
+    assert jobs.error(job_id)
+
+
+def test_expired_failures_are_pruned_without_a_resubmit(cache):
+    jobs = ForecastJobs(cache=cache, max_workers=1, retry_seconds=1)
+    job_ids = [jobs.submit(country, SERIES, cutoff=2019, order=BAD_ORDER, steps=5) for country in ("A", "B", "C")]
+    for job_id in job_ids:
+        _wait(jobs, job_id)
+    time.sleep(1.1)
+    jobs.error("another job")
+    assert jobs._failed == {}
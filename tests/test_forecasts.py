@@ -0,0 +1,56 @@
+#Panel forecasts and their year labels for countries whose reports end before the latest year
+import numpy as np
+import pandas as pd
+
+from energy_core.panel_forecast import forecast_ar_panel
+from energy_core.pipeline import complete_forecasts, country_forecasts, forecast_years, too_short_to_forecast
+
+STEPS = 5
+
+
+def _series(seed, length):
+    rng = np.random.default_rng(seed)
+    return 100 + np.cumsum(rng.normal(2, 1, length))
+
+
+def _history():
+    # Country A reports 2000-2020, country B stops after 2014
+    years = pd.Index(range(2000, 2021), name="Year")
+    history = pd.DataFrame({"A": _series(1, len(years)), "B": _series(2, len(years))}, index=years)
+    history.loc[history.index > 2014, "B"] = np.nan
+    return history
+
+
+def test_series_ending_early_is_forecast_from_its_own_end():
+    history = _history()
+    forecasts = forecast_ar_panel(history.to_numpy().T, STEPS)
+    alone = forecast_ar_panel(history["B"].dropna().to_numpy()[None, :], STEPS)
+    assert np.isfinite(forecasts).all()
+    np.testing.assert_allclose(forecasts[1], alone[0])
+    # Continues from the last reported value rather than jumping
+    assert abs(forecasts[1, 0] - history["B"].dropna().iloc[-1]) < 10
+
+
+def test_panel_engine_forecasts_every_country():
+    history = _history()
+    forecasts = country_forecasts(history, ["A", "B"], 2020, STEPS, panel_engine=True)
+    complete, incomplete = complete_forecasts(forecasts)
+    assert incomplete == []
+    assert list(complete) == ["A", "B"]
+    assert list(forecast_years(history, "A", 2020, STEPS)) == [2021, 2022, 2023, 2024, 2025]
+    assert list(forecast_years(history, "B", 2020, STEPS)) == [2015, 2016, 2017, 2018, 2019]
+
+
+def test_too_short_series_has_no_forecast():
+    values = np.array([[1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0], [np.nan, np.nan, np.nan, np.nan, np.nan, 1.0, 2.0]])
+    forecasts = forecast_ar_panel(values, STEPS)
+    assert np.isfinite(forecasts[0]).all()
+    assert np.isnan(forecasts[1]).all()
+
+
+def test_too_short_to_forecast_counts_years_in_the_selection():
+    history = _history().loc[2012:]
+    assert too_short_to_forecast(history, ["A", "B"], 2020) == {
+        "B": "needs at least 5 years of data in the selected range, has 3"}
+    assert too_short_to_forecast(history, ["A"], 2013) == {
+        "A": "needs at least 5 years of data in the selected range, has 2"}
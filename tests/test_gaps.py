@@ -0,0 +1,44 @@
+#Gap detection and interpolation of the cleaned panel
+import numpy as np
+import pandas as pd
+
+from energy_core.gaps import CleanPanel, gap_kinds, interpolate_gaps
+
+
+def test_interpolate_gaps_fills_interior_only():
+    values = np.array([[np.nan, 1.0, np.nan, np.nan, 4.0, np.nan]])
+    filled, interior = interpolate_gaps(values)
+    np.testing.assert_allclose(filled[0, 1:5], [1.0, 2.0, 3.0, 4.0])
+    assert np.isnan(filled[0, 0]) and np.isnan(filled[0, 5])
+    assert interior.tolist() == [[False, False, True, True, False, False]]
+
+
+def test_gap_kinds():
+    values = np.array([[np.nan, 1.0, np.nan, 2.0, np.nan]])
+    assert gap_kinds(values).tolist() == [["leading", "", "interior", "", "trailing"]]
+
+
+def _frame():
+    # A reports 2000-2009 with 2003-2004 missing; B only 2000, 2001, 2008 and 2009; C stops after 2005
+    records = []
+    for country, years in (("A", [2000, 2001, 2002, 2005, 2006, 2007, 2008, 2009]), ("B", [2000, 2001, 2008, 2009]),
+                           ("C", range(2000, 2006))):
+        for year in years:
+            records.append({"Country": country, "Region": "Europe", "Year": year,
+                            "primary_energy_consumption": float(year - 1990)})
+    return pd.DataFrame(records)
+
+
+def test_clean_panel_history_and_imputed_years():
+    panel = CleanPanel.from_frame(_frame(), columns=["primary_energy_consumption"])
+    history = panel.history(["A", "C"], ["Europe"], (2000, 2009))
+    np.testing.assert_allclose(history.loc[2003:2004, "A"], [13.0, 14.0])
+    assert history.loc[2006:, "C"].isna().all()
+    assert panel.imputed_years(["A", "B", "C"], (2000, 2009)) == {"A": [2003, 2004], "B": list(range(2002, 2008))}
+    assert list(panel.history(["A"], ["Asia"], (2000, 2009)).columns) == []
+
+
+def test_forecastable_counts_reported_years_only():
+    # B has 10 years after interpolation but only 4 reported
+    panel = CleanPanel.from_frame(_frame(), columns=["primary_energy_consumption"])
+    assert panel.forecastable() == {"A", "C"}
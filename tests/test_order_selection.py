@@ -0,0 +1,27 @@
+#ARIMA order search and the stored orders the dashboard reads
+import numpy as np
+
+from energy_core.order_selection import DEFAULT_ORDER, candidate_orders, select_order, stored_order
+
+
+def test_candidate_orders_grow_in_complexity_and_fit_the_data():
+    levels = candidate_orders(1, 12)
+    assert [sum(order[0] + order[2] for order in level) / len(level) for level in levels] == list(range(len(levels)))
+    # Every order keeps more than two observations per parameter
+    assert all(12 - 1 > 2 * (p + q + 1) for level in levels for p, _, q in level)
+    assert candidate_orders(1, 3) == []
+
+
+def test_select_order_returns_a_fitted_order():
+    rng = np.random.default_rng(3)
+    values = 100 + np.cumsum(rng.normal(1, 1, 30))
+    result = select_order(values)
+    assert len(result["order"]) == 3
+    assert result["score"] is not None
+    assert result["fitted"] >= 1
+
+
+def test_stored_order_falls_back_to_the_default():
+    orders = {"A": {"order": [1, 1, 0]}}
+    assert stored_order(orders, "A") == (1, 1, 0)
+    assert stored_order(orders, "B") == DEFAULT_ORDER
@@ -0,0 +1,33 @@
+#Growth scenarios: compounding, the fan bands against brute force, and the main forecast line against the fan median
+import numpy as np
+
+from energy_core.pipeline import apply_growth
+from energy_core.scenarios import fan_bands, grid_paths, monte_carlo_paths, path_multipliers, simulate
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def test_path_multipliers_compound_over_the_horizon():
+    gdp, population = np.full((1, 3), 10.0), np.full((1, 3), 0.0)
+    np.testing.assert_allclose(path_multipliers(gdp, population)[0], [1.1, 1.21, 1.331])
+
+
+def test_fan_bands_match_percentiles_of_every_path():
+    base = np.array([[100.0, 110.0, 120.0], [-50.0, -40.0, -30.0]])
+    gdp, population = monte_carlo_paths(2.0, 1.0, 1.5, 0.5, 2000, 3)
+    expected = np.percentile(simulate(base, gdp, population), PERCENTILES, axis=1).transpose(1, 0, 2)
+    np.testing.assert_allclose(fan_bands(base, gdp, population, PERCENTILES), expected)
+
+
+def test_grid_paths_cover_the_spread():
+    gdp, population = grid_paths(2.0, 1.0, 1.0, 0.5, 100, 4)
+    assert gdp.shape == population.shape == (100, 4)
+    assert gdp.min() == 0.0 and gdp.max() == 4.0
+    assert (gdp == gdp[:, :1]).all()
+
+
+def test_forecast_line_is_the_fan_median_without_volatility():
+    base = np.array([100.0, 105.0, 110.0, 115.0, 120.0])
+    gdp, population = monte_carlo_paths(3.0, 1.0, 0.0, 0.0, 10, len(base))
+    median = fan_bands(base[None, :], gdp, population, (50,))[0, 0]
+    np.testing.assert_allclose(apply_growth(base, 3.0, 1.0), median)
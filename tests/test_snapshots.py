@@ -0,0 +1,57 @@
+#Snapshot export: exported views answer like the live backend, and failing or short forecasts do not stop the export
+import os
+
+import pandas as pd
+import pytest
+
+from energy_core import pipeline, snapshots
+
+# The second view is too short to forecast; in the first, Country03's fit fails and Country01's must still run
+VIEWS = [{"regions": ["Europe"], "years": [2003, 2008], "countries": ["Country01", "Country03"]},
+         {"regions": ["Africa"], "years": [2009, 2010]}]
+
+
+@pytest.fixture(scope="module")
+def exported(dataset, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("snapshots") / "dataset.xlsx")
+    dataset.astype({"Region": str, "Country": str}).to_excel(path, index=False)
+    patch = pytest.MonkeyPatch()
+    real_forecasts = pipeline.country_forecasts
+    fitted = []
+
+    def flaky_forecasts(history, countries, *args, **kwargs):
+        if "Country03" in countries:
+            raise ValueError("fit failed")
+        fitted.extend(countries)
+        return real_forecasts(history, countries, *args, **kwargs)
+
+    patch.setattr(pipeline, "country_forecasts", flaky_forecasts)
+    manifest = snapshots.export_snapshots(path, VIEWS)
+    patch.undo()
+    from_store, version = pipeline.dataset_source(path)
+    live = pipeline.load_backend(path, version, from_store)
+    return manifest, snapshots.open_snapshot(version, lambda: live), live, fitted
+
+
+def test_every_view_is_exported(exported):
+    manifest, backend, _, fitted = exported
+    assert isinstance(backend, snapshots.SnapshotBackend)
+    assert len(manifest["views"]) == 3
+    directory = snapshots.snapshot_directory(manifest["version"])
+    assert not os.path.exists(directory + ".tmp")
+    # The default view's first forecastable country, then Country01 despite Country03 failing
+    assert fitted[1:] == ["Country01"]
+
+
+@pytest.mark.parametrize("regions, years", [(["Africa", "Europe", "North America"], (2000, 2010)),
+                                            (["Europe"], (2003, 2008)), (["Africa"], (2009, 2010))])
+def test_snapshot_answers_like_the_live_backend(exported, regions, years):
+    _, backend, live, _ = exported
+    assert backend.view(regions, years) is not None
+    assert backend.count(regions, years) == live.count(regions, years)
+    assert list(backend.countries(regions, years)) == list(map(str, live.countries(regions, years)))
+    pd.testing.assert_frame_equal(backend.trend(regions, years).reset_index(drop=True),
+                                  live.trend(regions, years).astype({"Region": str}).reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+    pd.testing.assert_series_equal(backend.source_totals(regions, years), live.source_totals(regions, years),
+                                   check_dtype=False, check_names=False)
@@ -0,0 +1,101 @@
+#The dataset store's rollups must give the same aggregates as the plain groupby after an append, including for a
+#region the first ingested file did not have
+import os
+
+import pandas as pd
+import pytest
+
+from energy_core import ingest
+from energy_core.backends import PandasBackend
+from energy_core.query_index import FrameIndex
+from energy_core.rollup_cube import RollupCube
+from test_aggregates import (SELECTIONS, _filtered, _normalized, expected_region_totals, expected_source_totals,
+                             expected_top_countries, expected_trend)
+
+
+@pytest.fixture(scope="module")
+def store(dataset, tmp_path_factory):
+    # init without Africa or the last year, then append the last year with Africa in it
+    directory = tmp_path_factory.mktemp("store")
+    patch = pytest.MonkeyPatch()
+    patch.setattr(ingest, "STORE_DIR", str(directory / "dataset"))
+    patch.setattr(ingest, "MANIFEST_PATH", str(directory / "dataset" / "manifest.json"))
+    last_year = int(dataset["Year"].max())
+    initial = dataset[(dataset["Region"] != "Africa") & (dataset["Year"] < last_year)]
+    appended = dataset[dataset["Year"] == last_year]
+    for name, frame in (("initial", initial), ("appended", appended)):
+        # Plain strings, as in a source file, so categories are only created for the labels each file has
+        frame = frame.astype({"Region": str, "Country": str})
+        frame.to_parquet(os.path.join(directory, f"{name}.parquet"), index=False)
+    ingest.init_store(os.path.join(directory, "initial.parquet"))
+    ingest.append(os.path.join(directory, "appended.parquet"))
+    df = ingest.load_dataset_store()
+    yield PandasBackend(df, RollupCube(ingest.load_store_rollups()), FrameIndex(df))
+    patch.undo()
+
+
+def _reference(dataset):
+    # The rows the store ends up with
+    return dataset[(dataset["Region"] != "Africa") | (dataset["Year"] == dataset["Year"].max())]
+
+
+def test_store_rows(store, dataset):
+    assert len(store) == len(_reference(dataset))
+
+
+@pytest.mark.parametrize("regions, year_range", SELECTIONS)
+def test_store_count(store, dataset, regions, year_range):
+    assert store.count(regions, year_range) == len(_filtered(_reference(dataset), regions, year_range))
+
+
+@pytest.mark.parametrize("regions, year_range", SELECTIONS)
+def test_store_trend(store, dataset, regions, year_range):
+    pd.testing.assert_frame_equal(
+        _normalized(store.trend(regions, year_range), ["Year", "Region"]),
+        _normalized(expected_trend(_reference(dataset), regions, year_range), ["Year", "Region"]),
+        check_dtype=False,
+    )
+
+
+@pytest.mark.parametrize("regions, year_range", SELECTIONS)
+def test_store_source_totals(store, dataset, regions, year_range):
+    pd.testing.assert_series_equal(store.source_totals(regions, year_range),
+                                   expected_source_totals(_reference(dataset), regions, year_range),
+                                   check_dtype=False, check_names=False)
+
+
+@pytest.mark.parametrize("regions, year_range", SELECTIONS)
+def test_store_top_countries(store, dataset, regions, year_range):
+    pd.testing.assert_frame_equal(
+        _normalized(store.top_countries(regions, year_range, n=3), ["Region", "Country"]),
+        _normalized(expected_top_countries(_reference(dataset), regions, year_range), ["Region", "Country"]),
+        check_dtype=False,
+    )
+
+
+@pytest.mark.parametrize("regions, year_range", SELECTIONS)
+def test_store_region_totals(store, dataset, regions, year_range):
+    pd.testing.assert_frame_equal(
+        _normalized(store.region_totals(regions, year_range[1]), ["Region"]),
+        _normalized(expected_region_totals(_reference(dataset), regions, year_range[1]), ["Region"]),
+        check_dtype=False,
+    )
+
+
+def test_append_replaces_stored_country_years(dataset, tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "STORE_DIR", str(tmp_path / "dataset"))
+    monkeypatch.setattr(ingest, "MANIFEST_PATH", str(tmp_path / "dataset" / "manifest.json"))
+    frame = dataset.drop_duplicates(["Country", "Year"]).astype({"Region": str, "Country": str})
+    frame.to_parquet(tmp_path / "initial.parquet", index=False)
+    ingest.init_store(str(tmp_path / "initial.parquet"))
+    version = ingest.dataset_store_version()
+
+    revised = frame[(frame["Country"] == "Country00") & (frame["Year"] == 2005)].assign(primary_energy_consumption=1.0)
+    revised.to_parquet(tmp_path / "revised.parquet", index=False)
+    summary = ingest.append(str(tmp_path / "revised.parquet"))
+    stored = ingest.load_dataset_store()
+    assert summary["years"] == [2005]
+    assert ingest.dataset_store_version() != version
+    assert len(stored) == len(frame)
+    row = stored[(stored["Country"] == "Country00") & (stored["Year"] == 2005)]
+    assert row["primary_energy_consumption"].tolist() == [1.0]